@@ -1,14 +1,500 @@
 import os
+import re
 import json
+import logging
+import copy
+import time
+import atexit
+import asyncio
+import concurrent.futures
+import hashlib
+import functools
+import heapq
+import sqlite3
+import threading
+from types import MappingProxyType
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+import httpx
+import orjson
 from dotenv import load_dotenv, find_dotenv
-from openai import OpenAI
-from typing import Dict, List, Any
+from openai import AsyncOpenAI
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+from typing import Dict, List, Any, Optional, Tuple, Coroutine, Callable
+
+logger = logging.getLogger(__name__)
 
 # טעינת משתני הסביבה מקובץ .env - חיפוש אוטומטי למעלה בהיררכיה
 load_dotenv(find_dotenv())
 
-# יצירת לקוח OpenAI - ייקח את המפתח אוטומטית מ-OPENAI_API_KEY
-client = OpenAI()
+# לולאת asyncio ייעודית שרצה ברקע - כל הקריאות ל-OpenAI רצות עליה
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+AI_MODEL = "gpt-4o-mini"
+
+# מטמון דוחות AI על הדיסק (SQLite) - מפתח לפי תוכן: פרטי העסק + הכללים התואמים
+AI_CACHE_PATH = os.getenv('AI_CACHE_PATH', os.path.join(os.path.dirname(__file__), "cache", "ai_reports.sqlite"))
+_cache_db: Optional[sqlite3.Connection] = None
+_cache_lock = threading.Lock()
+
+# שכבת LRU בזיכרון לפני ה-SQLite: (זמן יצירה, דוח). רשומות ישנות מ-AI_CACHE_TTL שניות פגות בשתי השכבות
+AI_CACHE_TTL = float(os.getenv('AI_CACHE_TTL', 3600))
+_AI_REPORT_MEMORY: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+_AI_REPORT_MEMORY_MAX = 512
+
+
+# מפתח ולקוח OpenAI נקבעים פעם אחת בטעינת המודול - אין מפתח אמיתי = אין לקוח ואין דוח AI.
+# הלקוח האסינכרוני משתף מאגר חיבורים (HTTP/2) לכל אורך חיי התהליך
+_API_KEY = os.getenv('OPENAI_API_KEY')
+_CLIENT: Optional[AsyncOpenAI] = AsyncOpenAI(
+    api_key=_API_KEY,
+    max_retries=2,  # ניסיון חוזר עם backoff על 429/5xx/ניתוק - על אותו מאגר חיבורים
+    http_client=httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+        timeout=httpx.Timeout(30.0, connect=5.0)
+    )
+) if _API_KEY and _API_KEY != 'your_openai_api_key_here' else None
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """Start (once) the background event loop that owns the OpenAI connection pool"""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="ai-helper-loop", daemon=True).start()
+    return _loop
+
+
+def submit_async(coro: Coroutine) -> concurrent.futures.Future:
+    """Start a coroutine on the shared AI event loop without waiting - the caller collects .result() later"""
+    return asyncio.run_coroutine_threadsafe(coro, _get_loop())
+
+
+@atexit.register
+def _close_client() -> None:
+    """Close the pooled connections on interpreter exit (only if the AI loop was ever started)"""
+    if _CLIENT is not None and _loop is not None and _loop.is_running():
+        try:
+            submit_async(_CLIENT.close()).result(timeout=5)
+        except Exception as e:
+            logger.debug("Closing the OpenAI client failed: %s", e)
+
+
+# מבנה דוח ה-AI - פענוח JSON, בדיקת טיפוסים וערכי ברירת מחדל במעבר אחד (pydantic-core)
+class _ReportModel(BaseModel):
+    model_config = ConfigDict(coerce_numbers_to_str=True)
+
+
+class ReportSummary(_ReportModel):
+    assessment: str = "לא סופק ניתוח"
+    complexity_level: str = "medium"
+    estimated_time: str = "לא סופקה הערכה"
+    key_challenges: List[str] = []
+
+
+class ReportAction(_ReportModel):
+    title: str = ""
+    priority: str = "medium"
+    category: str = "כללי"
+    based_on_rule_id: str = ""
+    required_professionals: List[str] = []
+    estimated_cost_range: str = "לא סופקה הערכה"
+    explanation: str = ""
+
+
+class ReportRisk(_ReportModel):
+    risk_type: str = "תפעולי"
+    description: str = ""
+    impact: str = "medium"
+    mitigation: str = ""
+
+
+class ReportTip(_ReportModel):
+    category: str = "כללי"
+    tip: str = ""
+    benefit: str = ""
+
+
+class ReportBudget(_ReportModel):
+    fixed_costs: List[str] = []
+    recurring_costs: List[str] = []
+    optional_costs: List[str] = []
+
+
+class AIReport(_ReportModel):
+    summary: ReportSummary = Field(default_factory=ReportSummary)
+    actions: List[ReportAction] = []
+    potential_risks: List[ReportRisk] = []
+    tips: List[ReportTip] = []
+    open_questions: List[str] = []
+    budget_planning: ReportBudget = Field(default_factory=ReportBudget)
+
+
+class AIReportBatch(_ReportModel):
+    reports: List[AIReport] = []
+
+
+# סכמת JSON לתשובת המודל - נגזרת מהמודלים פעם אחת בטעינת המודול. היא נשלחת בלי strict (לשדות יש ברירות מחדל,
+# ו-strict דורש שכל שדה יהיה חובה), ולכן היא רק מכוונת את המודל - הבדיקה האמיתית היא אימות ה-pydantic של התשובה
+def _json_schema_format(name: str, model: type) -> Dict[str, Any]:
+    return {"type": "json_schema", "json_schema": {"name": name, "schema": model.model_json_schema()}}
+
+
+_REPORT_RESPONSE_FORMAT = _json_schema_format("licensing_report", AIReport)
+_BATCH_RESPONSE_FORMAT = _json_schema_format("licensing_reports", AIReportBatch)
+
+
+# כותרות לא ברורות/קטועות שלא יוצגו כפעולה - מעבר אחד של regex במקום מספר בדיקות נפרדות
+_BAD_TITLE = re.compile(r'_____|^שהוא ו|ואחסנה של מזון\.|\.$')
+
+# ניקוי תשובת ה-AI: גדר markdown בקצוות, ומירכאות בין אותיות (קיצורים בעברית) שנשברות ב-JSON
+_CODE_FENCE_RE = re.compile(r'^```(?:json)?\s*|\s*```$')
+_HEB_QUOTE_RE = re.compile(r'(?<=\w)"(?=\w)')
+
+# אנשי מקצוע - tuples קבועים ברמת המודול, משותפים לכל הקטגוריות
+_PROS_FIRE = ("יועץ בטיחות אש",)
+_PROS_FIRE_FULL = ("יועץ בטיחות אש", "מהנדס", "קבלן מוסמך")
+_PROS_LICENSING = ("יועץ רישוי",)
+_PROS_SANITATION = ("יועץ תברואה",)
+_PROS_SANITATION_FULL = ("יועץ תברואה", "קבלן מוסמך")
+_PROS_GAS = ("מתקין גפ\"מ מוסמך", "מהנדס")
+
+# טבלת תמחור לפי קטגוריה: מילות מפתח בכותרת -> (עדיפות, טווח עלויות, אנשי מקצוע) + הסבר ידידותי
+# הסדר חשוב - הקטגוריה הראשונה שמופיעה בשם הקטגוריה של הכלל היא הקובעת
+CATEGORY_RULES: Dict[str, Dict[str, Any]] = {
+    "כבאות": {
+        "title_patterns": (
+            (("מערכת", "התקנה"), ("high", "₪3,000-12,000", _PROS_FIRE_FULL)),
+            (("בדיקה", "אישור"), ("high", "₪800-2,500", _PROS_FIRE)),
+        ),
+        "default": ("medium", "₪1,200-3,500", _PROS_FIRE),
+        "explanation": "דרישה לבטיחות אש והצלה - יש לקבל אישור מרשויות הכיבוי"
+    },
+    "משטרה": {
+        "title_patterns": (
+            (("רישיון",), ("high", "₪300-800", _PROS_LICENSING)),
+            (("בדיקה",), ("medium", "₪200-600", _PROS_LICENSING)),
+        ),
+        "default": ("medium", "₪400-1,200", _PROS_LICENSING),
+        "explanation": "דרישה רגולטורית - יש לקבל אישור ממשטרת ישראל"
+    },
+    "בריאות": {
+        "title_patterns": (
+            (("מערכת", "התקנה"), ("high", "₪1,500-5,000", _PROS_SANITATION_FULL)),
+            (("בדיקה",), ("medium", "₪400-1,200", _PROS_SANITATION)),
+        ),
+        "default": ("medium", "₪600-2,000", _PROS_SANITATION),
+        "explanation": "דרישה תברואתית - יש לקבל אישור ממשרד הבריאות"
+    },
+    "גז": {
+        "title_patterns": (),
+        "default": ("high", "₪4,000-15,000", _PROS_GAS),
+        "explanation": "דרישה לבטיחות גז - יש לקבל אישור ממתקין גפ\"מ מוסמך"
+    }
+}
+
+DEFAULT_CATEGORY_RULE: Dict[str, Any] = {
+    "title_patterns": (),
+    "default": ("medium", "₪500-1,500", _PROS_LICENSING),
+    "explanation": "דרישה רגולטורית לקבלת רישיון העסק"
+}
+
+
+# חלקי הפרומפט הקבועים - נבנים פעם אחת בטעינת המודול, ורק פרטי העסק והכללים מורכבים בכל קריאה
+_PROMPT_HEAD = """אתה יועץ מומחה לרישוי עסקים בישראל עם 15 שנות ניסיון. תפקידך לנתח את פרטי העסק ולהכין דוח מקצועי ומותאם אישית.
+
+🏢 **פרטי העסק:**
+- סוג: מסעדה/בית אוכל  
+"""
+
+_PROMPT_RULES_HEADER = """📋 **דרישות רגולטוריות רלוונטיות:**
+"""
+
+_PROMPT_TAIL = """
+
+🎯 **משימתך:**
+צור דוח מקצועי המתאים בדיוק לעסק הזה, עם דגש על:
+1. ניתוח מעמיק של המורכבות והאתגרים
+2. פעולות קונקרטיות עם לוחות זמנים ועלויות מדויקות
+3. זיהוי סיכונים ודרכי מניעה
+4. טיפים מעשיים לחיסכון בזמן ובעלות
+5. תכנון תקציב מפורט
+
+נדרש להחזיר JSON במבנה המדויק הבא:
+{
+    "summary": {
+        "assessment": "הערכה כללית של מורכבות התהליך והנקודות העיקריות",
+        "complexity_level": "high/medium/low",
+        "estimated_time": "הערכת זמן משוערת לקבלת הרישיון",
+        "key_challenges": ["אתגר 1", "אתגר 2"]
+    },
+    "actions": [
+        {
+            "title": "כותרת הפעולה - ספציפית ומדידה",
+            "priority": "high/medium/low",
+            "category": "תשתית/בטיחות/תברואה/מסמכים",
+            "based_on_rule_id": "מזהה הכלל הרלוונטי",
+            "required_professionals": ["אנשי מקצוע נדרשים"],
+            "estimated_cost_range": "טווח עלויות משוער",
+            "explanation": "הסבר מפורט כולל דגשים ספציפיים"
+        }
+    ],
+    "potential_risks": [
+        {
+            "risk_type": "תפעולי/בטיחותי/רגולטורי",
+            "description": "תיאור הסיכון",
+            "impact": "high/medium/low",
+            "mitigation": "דרכי התמודדות מומלצות"
+        }
+    ],
+    "tips": [
+        {
+            "category": "תכנון/בטיחות/תפעול",
+            "tip": "טיפ מעשי וספציפי",
+            "benefit": "התועלת/החיסכון מיישום הטיפ"
+        }
+    ],
+    "open_questions": ["שאלות שצריך לברר - רק אם באמת חסר מידע מהותי"],
+    "budget_planning": {
+        "fixed_costs": ["התקנת מערכת גז: 15,000-25,000 ש״ח", "ייעוץ רישוי עסק: 3,000-5,000 ש״ח", "אישורי בטיחות: 2,000-4,000 ש״ח"],
+        "recurring_costs": ["תחזוקה שנתית למערכות בטיחות: 2,000-4,000 ש״ח", "ביטוח עסקי: 3,000-8,000 ש״ח לשנה", "אגרות רישוי שנתיות: 500-1,500 ש״ח"],
+        "optional_costs": ["שדרוג ציוד מטבח: 20,000-50,000 ש״ח", "מערכת אזעקה מתקדמת: 5,000-10,000 ש״ח", "פרסום ושיווק: 5,000-15,000 ש״ח"]
+    }
+}
+
+חשוב:
+1. כל הפעולות והטיפים חייבים להיות ספציפיים, מדידים וישימים
+2. יש לתעדף פעולות לפי דחיפות וחשיבות
+3. עלויות צריכות להיות מציאותיות ומבוססות על מחירי השוק הישראלי
+4. אין להמציא דרישות שלא מופיעות בכללים
+5. יש להתייחס לכל המאפיינים המיוחדים של העסק
+6. **חובה לכלול מחירים ספציפיים בש״ח בכל פריט בתכנון התקציב - לא רק תיאורים כלליים!**
+7. השתמש בטווחי מחירים מציאותיים (למשל: "התקנת מערכת גז: 15,000-25,000 ש״ח")"""
+
+# פרומפט לקבוצת עסקים - אותן הנחיות, אבל מערך דוחות אחד לכל עסק לפי הסדר
+AI_BATCH_SIZE = 5
+
+_BATCH_PROMPT_HEAD = """אתה יועץ מומחה לרישוי עסקים בישראל עם 15 שנות ניסיון. תפקידך לנתח כל אחד מהעסקים הבאים ולהכין לכל אחד דוח מקצועי ומותאם אישית.
+
+🏢 **פרטי העסקים (כולם מסוג מסעדה/בית אוכל):**
+"""
+
+_BATCH_PROMPT_INSTRUCTIONS = """
+החזר אובייקט JSON אחד במבנה {{"reports": [...]}} - מערך של {count} דוחות, דוח אחד לכל עסק ובאותו הסדר שבו העסקים מופיעים.
+כל דוח במערך חייב להיות במבנה ובהנחיות שלהלן:"""
+
+_SYSTEM_MESSAGE = {"role": "system", "content": "אתה יועץ מומחה לרישוי עסקים בישראל עם ניסיון רב. תחזיר תמיד JSON תקין בלבד, ללא טקסט נוסף."}
+
+
+def _action_template(profile: Tuple[str, str, Tuple[str, ...]], explanation: str) -> Dict[str, Any]:
+    """Prebuilt action dict; title, category and rule id are filled in per rule"""
+    priority, cost_range, professionals = profile
+    return {
+        "title": "",
+        "priority": priority,
+        "category": "",
+        "based_on_rule_id": "",
+        "required_professionals": list(professionals),
+        "estimated_cost_range": cost_range,
+        "explanation": explanation
+    }
+
+
+# תבניות פעולה מוכנות מראש לכל קטגוריה: ((מילות מפתח, תבנית), ...), תבנית ברירת מחדל
+_ACTION_TEMPLATES: Dict[Optional[str], Tuple[Tuple, Dict[str, Any]]] = {
+    cat_key: (
+        tuple((keywords, _action_template(profile, category_rule["explanation"]))
+              for keywords, profile in category_rule["title_patterns"]),
+        _action_template(category_rule["default"], category_rule["explanation"])
+    )
+    for cat_key, category_rule in (*CATEGORY_RULES.items(), (None, DEFAULT_CATEGORY_RULE))
+}
+
+
+# קטעי הדוח הבסיסי שאינם תלויים בעסק - נבנים פעם אחת כקבועים לקריאה בלבד
+# (MappingProxyType / tuple), והדוח מקבל מהם עותק רדוד בלבד
+_TIME_ESTIMATES = MappingProxyType({
+    "low": "2-4 שבועות",
+    "medium": "4-8 שבועות",
+    "high": "8-16 שבועות"
+})
+_COMPLEXITY_SIZE_LABELS = MappingProxyType({"low": "קטן", "medium": "בינוני", "high": "גדול"})
+_DEFAULT_CHALLENGES = ("עמידה בדרישות בסיסיות",)
+
+_TIP_DELIVERY = MappingProxyType({
+    "category": "שליחת מזון",
+    "tip": "הכן אזור ייעודי לשליחת מזון עם ציוד קירור מתאים",
+    "benefit": "עמידה בדרישות משרד הבריאות ומניעת קנסות"
+})
+_TIP_GAS = MappingProxyType({
+    "category": "בטיחות גז",
+    "tip": "בצע בדיקות תקינות גז כל 6 חודשים",
+    "benefit": "מניעת תאונות ועמידה בדרישות החוק"
+})
+_TIP_AFFIDAVIT = MappingProxyType({
+    "category": "כבאות",
+    "tip": "אתה זכאי למסלול תצהיר מפושט - נצל את היתרון",
+    "benefit": "חיסכון בזמן ובעלויות בהליך הרישוי"
+})
+_GENERAL_TIPS = (
+    MappingProxyType({
+        "category": "תכנון",
+        "tip": "התחל בתהליך הרישוי לפני השלמת העבודות",
+        "benefit": "חיסכון בזמן ומניעת עיכובים"
+    }),
+    MappingProxyType({
+        "category": "תיעוד",
+        "tip": "שמור את כל המסמכים והאישורים במקום נגיש",
+        "benefit": "הקלה בביקורות ובחידוש רישיונות"
+    })
+)
+
+_RISK_DELAYS = MappingProxyType({
+    "risk_type": "רגולטורי",
+    "description": "עיכובים בקבלת אישורים מהרשויות",
+    "impact": "medium",
+    "mitigation": "התחלה מוקדמת של התהליך ומעקב שוטף"
+})
+_RISK_GAS = MappingProxyType({
+    "risk_type": "בטיחותי",
+    "description": "סיכוני בטיחות הקשורים לשימוש בגז",
+    "impact": "high",
+    "mitigation": "התקנה מקצועית ובדיקות תקופתיות"
+})
+_RISK_ALCOHOL = MappingProxyType({
+    "risk_type": "רגולטורי",
+    "description": "דרישות מחמירות של המשטרה להגשת אלכוהול",
+    "impact": "high",
+    "mitigation": "התייעצות עם יועץ מומחה ועמידה קפדנית בדרישות"
+})
+
+_OPEN_QUESTIONS = (
+    "האם יש דרישות מיוחדות מהרשות המקומית?",
+    "האם העסק ממוקם באזור מוגבל או מיוחד?"
+)
+_FIXED_COSTS = ("אגרות רישוי", "בדיקות מקצועיות", "שילוט בטיחות")
+_RECURRING_COSTS = ("חידוש רישיונות", "בדיקות תקופתיות")
+_OPTIONAL_COSTS = ("שדרוגי בטיחות נוספים", "ייעוץ מקצועי מתמשך")
+
+
+def _is_valid_title(title: Optional[str]) -> bool:
+    """Reject empty, very short, truncated or malformed rule titles"""
+    title = (title or "").strip()
+    return len(title) >= 10 and not _BAD_TITLE.search(title)
+
+
+def _match_category(category: str) -> Optional[str]:
+    """Return the CATEGORY_RULES key contained in a rule category name, if any"""
+    return next((key for key in CATEGORY_RULES if key in category), None)
+
+
+@functools.lru_cache(maxsize=None)
+def _category_templates(category: str) -> Tuple[Tuple, Dict[str, Any]]:
+    """Action templates for an exact category name (the substring scan runs once per distinct category)"""
+    return _ACTION_TEMPLATES[_match_category(category)]
+
+
+def _cache_key(business_data: Dict[str, Any], matching_rules: List[Dict[str, Any]]) -> str:
+    """Content hash of the canonicalized (business_data, rules) pair - every rule field the reports are built from"""
+    canonical = {
+        "model": AI_MODEL,
+        "area": business_data.get('area'),
+        "seats": business_data.get('seats'),
+        "features": sorted(business_data.get('features') or [])
+    }
+    # קטגוריה והערה נכנסות לפרומפט ולדוח הבסיסי - שינוי שלהן בכללים חייב לייצר מפתח חדש
+    rules_key = sorted(
+        (rule.get('id', ''), rule['category'], rule['title'], rule.get('note', ''))
+        for rule in matching_rules
+    )
+    return hashlib.blake2b(
+        json.dumps([canonical, rules_key], sort_keys=True, ensure_ascii=False).encode('utf-8'),
+        digest_size=16
+    ).hexdigest()
+
+
+def _get_cache_db() -> sqlite3.Connection:
+    """Open (once) the on-disk AI report cache. Caller must hold _cache_lock"""
+    global _cache_db
+    if _cache_db is None:
+        os.makedirs(os.path.dirname(AI_CACHE_PATH), exist_ok=True)
+        _cache_db = sqlite3.connect(AI_CACHE_PATH, check_same_thread=False)
+        # WAL: קוראים (גם מ-workers אחרים של gunicorn) לא נחסמים בזמן כתיבה, ובלי fsync מלא על כל commit
+        _cache_db.execute("PRAGMA journal_mode=WAL")
+        _cache_db.execute("PRAGMA synchronous=NORMAL")
+        _cache_db.execute(
+            "CREATE TABLE IF NOT EXISTS ai_reports ("
+            "key TEXT PRIMARY KEY, report TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        _cache_db.commit()
+    return _cache_db
+
+
+def _remember(key: str, created_at: float, report: Dict[str, Any]) -> None:
+    """Put a report in the in-memory LRU. Caller must hold _cache_lock"""
+    _AI_REPORT_MEMORY[key] = (created_at, report)
+    _AI_REPORT_MEMORY.move_to_end(key)
+    if len(_AI_REPORT_MEMORY) > _AI_REPORT_MEMORY_MAX:
+        _AI_REPORT_MEMORY.popitem(last=False)
+
+
+def _cache_get(key: str) -> Optional[Dict[str, Any]]:
+    """Return a cached AI report, or None on miss/expiry (cache errors are never fatal)"""
+    min_created_at = time.time() - AI_CACHE_TTL
+    try:
+        with _cache_lock:
+            entry = _AI_REPORT_MEMORY.get(key)
+            if entry is not None:
+                if entry[0] >= min_created_at:
+                    _AI_REPORT_MEMORY.move_to_end(key)
+                    return copy.deepcopy(entry[1])
+                del _AI_REPORT_MEMORY[key]
+            row = _get_cache_db().execute(
+                "SELECT report, created_at FROM ai_reports WHERE key = ? AND created_at >= ?",
+                (key, min_created_at)
+            ).fetchone()
+            if row is None:
+                return None
+            report = orjson.loads(row[0])
+            _remember(key, row[1], report)
+        return copy.deepcopy(report)
+    except Exception as e:
+        logger.warning("AI cache read failed: %s", e)
+        return None
+
+
+def _cache_set(key: str, report: Dict[str, Any]) -> None:
+    """Store a validated AI report in memory and in the on-disk cache"""
+    created_at = time.time()
+    try:
+        with _cache_lock:
+            _remember(key, created_at, copy.deepcopy(report))
+            db = _get_cache_db()
+            db.execute(
+                "INSERT OR REPLACE INTO ai_reports (key, report, created_at) VALUES (?, ?, ?)",
+                (key, orjson.dumps(report).decode('utf-8'), created_at)
+            )
+            db.commit()
+    except Exception as e:
+        logger.warning("AI cache write failed: %s", e)
+
+
+def ai_job_key(business_data: Dict[str, Any], matching_rules: List[Dict[str, Any]]) -> str:
+    """Id of the AI report for a business and its matched rules - the cache key, so every worker derives the same id"""
+    return _cache_key(business_data, matching_rules)
+
+
+def get_cached_report(key: str) -> Optional[Dict[str, Any]]:
+    """A finished AI report from the shared cache (memory, then SQLite), or None"""
+    return _cache_get(key)
+
+
+async def _off_loop(func: Callable[..., Any], *args: Any) -> Any:
+    """Run blocking cache I/O (SQLite, _cache_lock, deepcopy) in the loop's thread pool - the in-flight OpenAI streams keep going"""
+    return await asyncio.get_running_loop().run_in_executor(None, func, *args)
 
 
 def create_basic_report(business_data: Dict[str, Any], matching_rules: List[Dict[str, Any]]) -> Dict[str, Any]:
@@ -37,185 +523,74 @@ def create_basic_report(business_data: Dict[str, Any], matching_rules: List[Dict
     if "gas" in features:
         complexity_factors.append("שימוש בגז")
     
-    # Estimate time based on complexity and rules
-    time_estimates = {
-        "low": "2-4 שבועות",
-        "medium": "4-8 שבועות", 
-        "high": "8-16 שבועות"
-    }
-    
     # Generate specific actions based on rules - limit to most important ones
     actions = []
     
-    # Group rules by category and priority
-    categorized_rules = {}
+    # Group rules by category (one dict lookup per rule)
+    categorized_rules = defaultdict(list)
     for rule in matching_rules:
-        category = rule['category']
-        if category not in categorized_rules:
-            categorized_rules[category] = []
-        categorized_rules[category].append(rule)
+        categorized_rules[rule['category']].append(rule)
     
     # Select most important rules from each category (limit total to 12 actions max)
     total_actions_limit = 12
-    actions_per_category = max(1, total_actions_limit // len(categorized_rules)) if categorized_rules else 1
+    category_count = len(categorized_rules)
+    actions_per_category = max(1, total_actions_limit // category_count) if category_count else 1
     
     for category, rules in categorized_rules.items():
-        # Sort by title length (shorter titles are usually more general/important)
-        sorted_rules = sorted(rules, key=lambda r: len(r['title']))
-        selected_rules = sorted_rules[:actions_per_category]  # Limit per category
+        # המגבלה הכוללת נאכפת גם כשיש יותר קטגוריות מפעולות
+        remaining = total_actions_limit - len(actions)
+        if remaining <= 0:
+            break
+        
+        # שם הקטגוריה המדויק ממופה לתבניות פעם אחת לכל חיי התהליך
+        title_templates, default_template = _category_templates(category)
         
-        for rule in selected_rules:
-            # Skip rules with unclear or incomplete titles
-            if (not rule['title'] or 
-                len(rule['title'].strip()) < 10 or 
-                '_____' in rule['title'] or
-                rule['title'].strip().endswith('.') or
-                rule['title'].startswith('שהוא ו') or
-                'ואחסנה של מזון.' in rule['title']):
-                continue
-                
-            priority = "medium"
-            cost_range = "₪500-1,500"
-            professionals = ["יועץ רישוי"]
-            
-            # Set specific costs and professionals based on rule content
-            if "כבאות" in rule['category']:
-                if "מערכת" in rule['title'] or "התקנה" in rule['title']:
-                    priority = "high"
-                    cost_range = "₪3,000-12,000"
-                    professionals = ["יועץ בטיחות אש", "מהנדס", "קבלן מוסמך"]
-                elif "בדיקה" in rule['title'] or "אישור" in rule['title']:
-                    priority = "high"
-                    cost_range = "₪800-2,500"
-                    professionals = ["יועץ בטיחות אש"]
-                else:
-                    priority = "medium"
-                    cost_range = "₪1,200-3,500"
-                    professionals = ["יועץ בטיחות אש"]
-                    
-            elif "משטרה" in rule['category']:
-                if "רישיון" in rule['title']:
-                    priority = "high"
-                    cost_range = "₪300-800"
-                    professionals = ["יועץ רישוי"]
-                elif "בדיקה" in rule['title']:
-                    priority = "medium"
-                    cost_range = "₪200-600"
-                    professionals = ["יועץ רישוי"]
-                else:
-                    priority = "medium"
-                    cost_range = "₪400-1,200"
-                    professionals = ["יועץ רישוי"]
-                    
-            elif "בריאות" in rule['category']:
-                if "מערכת" in rule['title'] or "התקנה" in rule['title']:
-                    priority = "high"
-                    cost_range = "₪1,500-5,000"
-                    professionals = ["יועץ תברואה", "קבלן מוסמך"]
-                elif "בדיקה" in rule['title']:
-                    priority = "medium"
-                    cost_range = "₪400-1,200"
-                    professionals = ["יועץ תברואה"]
-                else:
-                    priority = "medium"
-                    cost_range = "₪600-2,000"
-                    professionals = ["יועץ תברואה"]
-                    
-            elif "גז" in rule['category']:
-                priority = "high"
-                cost_range = "₪4,000-15,000"
-                professionals = ["מתקין גפ\"מ מוסמך", "מהנדס"]
+        # Skip rules with unclear or incomplete titles before ranking them.
+        # (אורך כותרת, מיקום, כלל) - האורך מחושב פעם אחת והמיקום שומר על סדר יציב בלי key בפייתון
+        ranked_rules = [
+            (len(rule['title']), index, rule)
+            for index, rule in enumerate(rules)
+            if _is_valid_title(rule['title'])
+        ]
         
-            # Create user-friendly explanation instead of technical note
-            explanation = ""
-            if "כבאות" in rule['category']:
-                explanation = "דרישה לבטיחות אש והצלה - יש לקבל אישור מרשויות הכיבוי"
-            elif "משטרה" in rule['category']:
-                explanation = "דרישה רגולטורית - יש לקבל אישור ממשטרת ישראל"
-            elif "בריאות" in rule['category']:
-                explanation = "דרישה תברואתית - יש לקבל אישור ממשרד הבריאות"
-            elif "גז" in rule['category']:
-                explanation = "דרישה לבטיחות גז - יש לקבל אישור ממתקין גפ\"מ מוסמך"
-            else:
-                explanation = "דרישה רגולטורית לקבלת רישיון העסק"
-
-            actions.append({
-                "title": rule['title'],
-                "priority": priority,
-                "category": rule['category'],
-                "based_on_rule_id": rule.get('id', ''),
-                "required_professionals": professionals,
-                "estimated_cost_range": cost_range,
-                "explanation": explanation
-            })
+        # Shortest titles first (usually more general/important), limited per category
+        selected_rules = heapq.nsmallest(min(actions_per_category, remaining), ranked_rules)
+        
+        for _, _, rule in selected_rules:
+            # סריקה אחת של הכותרת לבחירת תבנית הפעולה, והעתקה שלה עם השדות של הכלל
+            template = next(
+                (template for keywords, template in title_templates
+                 if any(keyword in rule['title'] for keyword in keywords)),
+                default_template
+            )
+            action = template.copy()
+            action["title"] = rule['title']
+            action["category"] = rule['category']
+            action["based_on_rule_id"] = rule.get('id', '')
+            actions.append(action)
     
     # Generate relevant tips based on features
     tips = []
     if "delivery" in features:
-        tips.append({
-            "category": "שליחת מזון",
-            "tip": "הכן אזור ייעודי לשליחת מזון עם ציוד קירור מתאים",
-            "benefit": "עמידה בדרישות משרד הבריאות ומניעת קנסות"
-        })
-    
+        tips.append(dict(_TIP_DELIVERY))
     if "gas" in features:
-        tips.append({
-            "category": "בטיחות גז",
-            "tip": "בצע בדיקות תקינות גז כל 6 חודשים",
-            "benefit": "מניעת תאונות ועמידה בדרישות החוק"
-        })
-    
+        tips.append(dict(_TIP_GAS))
     if area <= 150 and seats <= 50:
-        tips.append({
-            "category": "כבאות",
-            "tip": "אתה זכאי למסלול תצהיר מפושט - נצל את היתרון",
-            "benefit": "חיסכון בזמן ובעלויות בהליך הרישוי"
-        })
+        tips.append(dict(_TIP_AFFIDAVIT))
     
     # Always add general tips
-    tips.extend([
-        {
-            "category": "תכנון",
-            "tip": "התחל בתהליך הרישוי לפני השלמת העבודות",
-            "benefit": "חיסכון בזמן ומניעת עיכובים"
-        },
-        {
-            "category": "תיעוד",
-            "tip": "שמור את כל המסמכים והאישורים במקום נגיש",
-            "benefit": "הקלה בביקורות ובחידוש רישיונות"
-        }
-    ])
+    tips.extend(dict(tip) for tip in _GENERAL_TIPS)
     
     # Generate potential risks
-    risks = [
-        {
-            "risk_type": "רגולטורי",
-            "description": "עיכובים בקבלת אישורים מהרשויות",
-            "impact": "medium",
-            "mitigation": "התחלה מוקדמת של התהליך ומעקב שוטף"
-        }
-    ]
-    
+    risks = [dict(_RISK_DELAYS)]
     if "gas" in features:
-        risks.append({
-            "risk_type": "בטיחותי",
-            "description": "סיכוני בטיחות הקשורים לשימוש בגז",
-            "impact": "high",
-            "mitigation": "התקנה מקצועית ובדיקות תקופתיות"
-        })
-    
+        risks.append(dict(_RISK_GAS))
     if "alcohol" in features:
-        risks.append({
-            "risk_type": "רגולטורי",
-            "description": "דרישות מחמירות של המשטרה להגשת אלכוהול",
-            "impact": "high",
-            "mitigation": "התייעצות עם יועץ מומחה ועמידה קפדנית בדרישות"
-        })
+        risks.append(dict(_RISK_ALCOHOL))
     
     # Generate budget planning
-    fixed_costs = ["אגרות רישוי", "בדיקות מקצועיות", "שילוט בטיחות"]
-    recurring_costs = ["חידוש רישיונות", "בדיקות תקופתיות"]
-    optional_costs = ["שדרוגי בטיחות נוספים", "ייעוץ מקצועי מתמשך"]
+    fixed_costs = list(_FIXED_COSTS)
+    recurring_costs = list(_RECURRING_COSTS)
     
     if "gas" in features:
         fixed_costs.extend(["התקנת מערכת גז", "מערכת כיבוי למנדפים"])
@@ -227,227 +602,224 @@ def create_basic_report(business_data: Dict[str, Any], matching_rules: List[Dict
     
     return {
         "summary": {
-            "assessment": f"עסק {'קטן' if complexity == 'low' else 'בינוני' if complexity == 'medium' else 'גדול'} בגודל {area} מ\"ר עם {seats} מקומות ישיבה. נדרשת עמידה בדרישות רגולטוריות מרכזיות.",
+            "assessment": f"עסק {_COMPLEXITY_SIZE_LABELS[complexity]} בגודל {area} מ\"ר עם {seats} מקומות ישיבה. נדרשת עמידה בדרישות רגולטוריות מרכזיות.",
             "complexity_level": complexity,
-            "estimated_time": time_estimates[complexity],
-            "key_challenges": complexity_factors if complexity_factors else ["עמידה בדרישות בסיסיות"]
+            "estimated_time": _TIME_ESTIMATES[complexity],
+            "key_challenges": complexity_factors if complexity_factors else list(_DEFAULT_CHALLENGES)
         },
         "actions": actions,
         "potential_risks": risks,
         "tips": tips,
-        "open_questions": [
-            "האם יש דרישות מיוחדות מהרשות המקומית?",
-            "האם העסק ממוקם באזור מוגבל או מיוחד?"
-        ],
+        "open_questions": list(_OPEN_QUESTIONS),
         "budget_planning": {
             "fixed_costs": fixed_costs,
             "recurring_costs": recurring_costs,
-            "optional_costs": optional_costs
+            "optional_costs": list(_OPTIONAL_COSTS)
         }
     }
 
 
-def generate_ai_report(business_data: Dict[str, Any], matching_rules: List[Dict[str, Any]]) -> Dict[str, Any]:
+@functools.lru_cache(maxsize=4096)
+def _rule_prompt_line(category: str, title: str, note: str) -> str:
+    """שורת כלל אחת בפרומפט - הכללים קבועים, כך שכל שורה נבנית פעם אחת"""
+    return f"- {category}: {title}\n  {note}"
+
+
+@functools.lru_cache(maxsize=None)
+def _batch_instructions(count: int) -> str:
+    """הוראות הפרומפט המקובץ לגודל קבוצה נתון"""
+    return _BATCH_PROMPT_INSTRUCTIONS.format(count=count)
+
+
+def _format_rules_text(matching_rules: List[Dict[str, Any]]) -> str:
+    """יצירת רשימת דרישות מפורטת לפרומפט"""
+    return "\n".join(
+        _rule_prompt_line(rule['category'], rule['title'], rule.get('note', ''))
+        for rule in matching_rules
+    )
+
+
+def _format_business_block(business_data: Dict[str, Any]) -> str:
+    """פרטי העסק המשתנים בפרומפט"""
+    return (
+        f"- שטח: {business_data['area']} מ\"ר\n"
+        f"- מקומות ישיבה: {business_data['seats']}\n"
+        f"- מאפיינים מיוחדים: {', '.join(business_data['features'])}\n\n"
+    )
+
+
+@dataclass(frozen=True)
+class BusinessProfile:
+    """עסק + הכללים התואמים לו, עם מפתח המטמון - נבנה פעם אחת ומשמש גם למטמון וגם לפרומפט"""
+    business_data: Dict[str, Any]
+    matching_rules: List[Dict[str, Any]]
+    cache_key: str
+
+    @classmethod
+    def build(cls, business_data: Dict[str, Any], matching_rules: List[Dict[str, Any]]) -> "BusinessProfile":
+        return cls(business_data, matching_rules, _cache_key(business_data, matching_rules))
+
+    def prompt_section(self) -> str:
+        """פרטי העסק ורשימת הכללים - החלק המשתנה בפרומפט (נבנה רק כשאין דוח במטמון)"""
+        return f"{_format_business_block(self.business_data)}{_PROMPT_RULES_HEADER}{_format_rules_text(self.matching_rules)}"
+
+
+async def _request_completion(prompt: str, max_tokens: int, response_format: Dict[str, Any]) -> str:
+    """Send one schema-guided streaming chat completion and return the raw content"""
+    logger.debug("Sending request to OpenAI (prompt_chars=%d)", len(prompt))
+    
+    # סכמת JSON (לא strict) + streaming: המודל מתבקש להחזיר JSON לפי הסכמה, והטוקנים נאספים תוך כדי הגעתם.
+    # התשובה עדיין עוברת אימות pydantic אצל הקורא
+    stream = await _CLIENT.chat.completions.create(
+        model=AI_MODEL,
+        messages=[
+            _SYSTEM_MESSAGE,
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.7,
+        max_tokens=max_tokens,
+        response_format=response_format,
+        stream=True,
+        stream_options={"include_usage": True}
+    )
+    content_parts = []
+    usage = None
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            content_parts.append(chunk.choices[0].delta.content)
+        if chunk.usage is not None:
+            usage = chunk.usage
+    if usage is not None:
+        logger.info("OpenAI token usage: prompt=%d completion=%d total=%d",
+                    usage.prompt_tokens, usage.completion_tokens, usage.total_tokens)
+    return "".join(content_parts)
+
+
+def _clean_ai_content(raw_content: str) -> str:
+    """Clean up common JSON issues from AI responses"""
+    # Remove any markdown code fence around the JSON, then replace quotes between letters
+    # (מ"ר, ת"י, גפ"מ, ש"ח, ק"ג ...) with gershayim - one pass each
+    cleaned_content = _CODE_FENCE_RE.sub('', raw_content.strip())
+    return _HEB_QUOTE_RE.sub('״', cleaned_content)
+
+
+def _validate_report(ai_response: Dict[str, Any]) -> Dict[str, Any]:
+    """וידוא תקינות המבנה ומילוי ערכי ברירת מחדל אם צריך"""
+    return AIReport.model_validate(ai_response).model_dump()
+
+
+async def generate_ai_report(business_data: Dict[str, Any], matching_rules: List[Dict[str, Any]]) -> Dict[str, Any]:
     """יצירת דוח AI מותאם אישית עם ניתוח מעמיק ומעשי"""
     
-    # Check if OpenAI API key is available
-    api_key = os.getenv('OPENAI_API_KEY')
-    print("🔑 API Key loaded:", bool(api_key))
-    if not api_key or api_key == 'your_openai_api_key_here':
-        print("❌ אין חיבור ל-ChatGPT - לא יוצג דוח AI")
+    if _CLIENT is None:
+        logger.debug("No OpenAI API key configured - skipping AI report")
         return None  # אין AI - אין דוח
     
+    profile = BusinessProfile.build(business_data, matching_rules)
+    cached_report = await _off_loop(_cache_get, profile.cache_key)
+    if cached_report is not None:
+        logger.debug("AI report served from cache")
+        return cached_report
+    
     try:
-        print(f"🤖 Starting AI report generation for business: {business_data['area']}m², {business_data['seats']} seats, features: {business_data['features']}")
+        logger.debug("Generating AI report: area=%s seats=%s features=%s rules=%d",
+                     business_data['area'], business_data['seats'], business_data['features'], len(matching_rules))
         
-        # יצירת רשימת דרישות מפורטת
-        rules_text = "\n".join([
-            f"- {rule['category']}: {rule['title']}\n  {rule.get('note', '')}"
-            for rule in matching_rules
-        ])
-        print(f"📋 Processing {len(matching_rules)} regulatory rules")
+        prompt = f"{_PROMPT_HEAD}{profile.prompt_section()}{_PROMPT_TAIL}"
+        raw_content = await _request_completion(prompt, 3000, _REPORT_RESPONSE_FORMAT)
+        logger.debug("Raw AI response: %.500s", raw_content)
+        try:
+            report = AIReport.model_validate_json(raw_content)
+        except ValidationError:
+            # JSON mode מחזיר JSON תקין - הניקוי נשאר רק כגיבוי לתשובה חריגה
+            report = AIReport.model_validate_json(_clean_ai_content(raw_content))
+        validated_response = report.model_dump()
+        await _off_loop(_cache_set, profile.cache_key, validated_response)
+        return validated_response
 
-        prompt = f"""אתה יועץ מומחה לרישוי עסקים בישראל עם 15 שנות ניסיון. תפקידך לנתח את פרטי העסק ולהכין דוח מקצועי ומותאם אישית.
+    except ValidationError as e:
+        # JSON לא תקין או מבנה שגוי - נדיר עם סכמת JSON; מטופל כמו כל כשל AI
+        logger.warning("Invalid AI response: %s", e)
+        return None
+    except Exception as e:
+        logger.error("OpenAI API error: %s (status=%s)", e, getattr(getattr(e, 'response', None), 'status_code', 'Unknown'))
+        return None  # אין AI - אין דוח
 
-🏢 **פרטי העסק:**
-- סוג: מסעדה/בית אוכל  
-- שטח: {business_data['area']} מ"ר
-- מקומות ישיבה: {business_data['seats']}
-- מאפיינים מיוחדים: {', '.join(business_data['features'])}
 
-📋 **דרישות רגולטוריות רלוונטיות:**
-{rules_text}
+async def generate_ai_reports_batch(pairs: List[Tuple[Dict[str, Any], List[Dict[str, Any]]]]) -> List[Optional[Dict[str, Any]]]:
+    """יצירת מספר דוחות AI במקביל - כל הבקשות נשלחות יחד על אותה לולאה"""
+    return await asyncio.gather(*[
+        generate_ai_report(business_data, matching_rules)
+        for business_data, matching_rules in pairs
+    ])
 
-🎯 **משימתך:**
-צור דוח מקצועי המתאים בדיוק לעסק הזה, עם דגש על:
-1. ניתוח מעמיק של המורכבות והאתגרים
-2. פעולות קונקרטיות עם לוחות זמנים ועלויות מדויקות
-3. זיהוי סיכונים ודרכי מניעה
-4. טיפים מעשיים לחיסכון בזמן ובעלות
-5. תכנון תקציב מפורט
 
-נדרש להחזיר JSON במבנה המדויק הבא:
-{{
-    "summary": {{
-        "assessment": "הערכה כללית של מורכבות התהליך והנקודות העיקריות",
-        "complexity_level": "high/medium/low",
-        "estimated_time": "הערכת זמן משוערת לקבלת הרישיון",
-        "key_challenges": ["אתגר 1", "אתגר 2"]
-    }},
-    "actions": [
-        {{
-            "title": "כותרת הפעולה - ספציפית ומדידה",
-            "priority": "high/medium/low",
-            "category": "תשתית/בטיחות/תברואה/מסמכים",
-            "based_on_rule_id": "מזהה הכלל הרלוונטי",
-            "required_professionals": ["אנשי מקצוע נדרשים"],
-            "estimated_cost_range": "טווח עלויות משוער",
-            "explanation": "הסבר מפורט כולל דגשים ספציפיים"
-        }}
-    ],
-    "potential_risks": [
-        {{
-            "risk_type": "תפעולי/בטיחותי/רגולטורי",
-            "description": "תיאור הסיכון",
-            "impact": "high/medium/low",
-            "mitigation": "דרכי התמודדות מומלצות"
-        }}
-    ],
-    "tips": [
-        {{
-            "category": "תכנון/בטיחות/תפעול",
-            "tip": "טיפ מעשי וספציפי",
-            "benefit": "התועלת/החיסכון מיישום הטיפ"
-        }}
-    ],
-    "open_questions": ["שאלות שצריך לברר - רק אם באמת חסר מידע מהותי"],
-    "budget_planning": {{
-        "fixed_costs": ["התקנת מערכת גז: 15,000-25,000 ש״ח", "ייעוץ רישוי עסק: 3,000-5,000 ש״ח", "אישורי בטיחות: 2,000-4,000 ש״ח"],
-        "recurring_costs": ["תחזוקה שנתית למערכות בטיחות: 2,000-4,000 ש״ח", "ביטוח עסקי: 3,000-8,000 ש״ח לשנה", "אגרות רישוי שנתיות: 500-1,500 ש״ח"],
-        "optional_costs": ["שדרוג ציוד מטבח: 20,000-50,000 ש״ח", "מערכת אזעקה מתקדמת: 5,000-10,000 ש״ח", "פרסום ושיווק: 5,000-15,000 ש״ח"]
-    }}
-}}
+async def generate_ai_reports_batched(pairs: List[Tuple[Dict[str, Any], List[Dict[str, Any]]]]) -> List[Optional[Dict[str, Any]]]:
+    """
+    יצירת מספר דוחות AI עם מעט בקשות: עד AI_BATCH_SIZE עסקים נארזים לפרומפט אחד
+    שמחזיר {"reports": [...]}, כך שההנחיות הקבועות ועלות ה-HTTP משולמות פעם אחת לכל קבוצה.
+    דוחות שכבר במטמון לא נשלחים למודל. עסק שהדוח שלו חסר בתשובה או פגום נשלח שוב בבקשה בודדת,
+    ואם גם היא נכשלת הוא מקבל None.
+    """
+    if _CLIENT is None:
+        return [None] * len(pairs)
+    
+    profiles = [BusinessProfile.build(business_data, matching_rules) for business_data, matching_rules in pairs]
+    # כל הבדיקות במטמון בקריאה אחת מחוץ ללולאה
+    results: List[Optional[Dict[str, Any]]] = await _off_loop(
+        lambda: [_cache_get(profile.cache_key) for profile in profiles]
+    )
+    pending = [(index, profile) for index, profile in enumerate(profiles) if results[index] is None]
+    
+    batches = [pending[i:i + AI_BATCH_SIZE] for i in range(0, len(pending), AI_BATCH_SIZE)]
+    batch_results = await asyncio.gather(*[_generate_batch(batch) for batch in batches])
+    fresh = []
+    for batch, reports in zip(batches, batch_results):
+        for (index, profile), report in zip(batch, reports):
+            if report is not None:
+                fresh.append((profile.cache_key, report))
+            results[index] = report
+    if fresh:
+        await _off_loop(lambda: [_cache_set(key, report) for key, report in fresh])
+    
+    # דוח שחסר בתשובת הקבוצה או לא עבר אימות - בקשה בודדת לכל אחד (generate_ai_report גם שומר אותו במטמון)
+    missing = [index for index, _ in pending if results[index] is None]
+    retries = await asyncio.gather(*[generate_ai_report(*pairs[index]) for index in missing])
+    for index, report in zip(missing, retries):
+        results[index] = report
+    return results
 
-חשוב:
-1. כל הפעולות והטיפים חייבים להיות ספציפיים, מדידים וישימים
-2. יש לתעדף פעולות לפי דחיפות וחשיבות
-3. עלויות צריכות להיות מציאותיות ומבוססות על מחירי השוק הישראלי
-4. אין להמציא דרישות שלא מופיעות בכללים
-5. יש להתייחס לכל המאפיינים המיוחדים של העסק
-6. **חובה לכלול מחירים ספציפיים בש״ח בכל פריט בתכנון התקציב - לא רק תיאורים כלליים!**
-7. השתמש בטווחי מחירים מציאותיים (למשל: "התקנת מערכת גז: 15,000-25,000 ש״ח")"""
 
-        print("🚀 Sending request to OpenAI...")
-        print(f"📝 Prompt length: {len(prompt)} characters")
-        
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "אתה יועץ מומחה לרישוי עסקים בישראל עם ניסיון רב. תחזיר תמיד JSON תקין בלבד, ללא טקסט נוסף."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=3000
+def _validate_batch_item(report: Any) -> Optional[Dict[str, Any]]:
+    """Validate one report from a batch reply, or None if it is malformed"""
+    if not isinstance(report, dict):
+        return None
+    try:
+        return _validate_report(report)
+    except ValidationError:
+        return None
+
+
+async def _generate_batch(batch: List[Tuple[int, BusinessProfile]]) -> List[Optional[Dict[str, Any]]]:
+    """שליחת קבוצת עסקים אחת בבקשה יחידה ופיצול התשובה לדוח לכל עסק"""
+    try:
+        businesses = "\n".join(
+            f"[{number}]\n{profile.prompt_section()}\n"
+            for number, (_, profile) in enumerate(batch, start=1)
         )
-        print("✅ Got response from OpenAI")
-        print(f"💰 Token usage - Prompt: {response.usage.prompt_tokens}, Completion: {response.usage.completion_tokens}, Total: {response.usage.total_tokens}")
-        
+        prompt = f"{_BATCH_PROMPT_HEAD}{businesses}{_batch_instructions(len(batch))}{_PROMPT_TAIL}"
+        raw_content = await _request_completion(prompt, 3000 * len(batch), _BATCH_RESPONSE_FORMAT)
         try:
-            print("Parsing response...")
-            raw_content = response.choices[0].message.content
-            print(f"🔍 Raw AI response (first 500 chars): {raw_content[:500]}...")
-            
-            # Clean up common JSON issues from AI responses
-            cleaned_content = raw_content.strip()
-            
-            # Fix common Hebrew text issues that break JSON
-            import re
-            # Replace all problematic quotes in Hebrew text with safe alternatives
-            cleaned_content = re.sub(r'(\w)"(\w)', r'\1״\2', cleaned_content)  # Hebrew quotes between letters
-            cleaned_content = cleaned_content.replace('מ"ר', 'מ״ר')  # Specific cases
-            cleaned_content = cleaned_content.replace('ת"י', 'ת״י')  
-            cleaned_content = cleaned_content.replace('גפ"מ', 'גפ״מ')
-            cleaned_content = cleaned_content.replace('ש"ח', 'ש״ח')  # Shekels
-            cleaned_content = cleaned_content.replace('ק"ג', 'ק״ג')  # Kilograms
-            
-            # Remove any markdown code blocks if present
-            if cleaned_content.startswith('```json'):
-                cleaned_content = cleaned_content.replace('```json', '').replace('```', '').strip()
-            elif cleaned_content.startswith('```'):
-                cleaned_content = cleaned_content.replace('```', '').strip()
-            
-            print(f"🧹 Cleaned content (first 500 chars): {cleaned_content[:500]}...")
-            ai_response = json.loads(cleaned_content)
-            print("Response parsed successfully")
-            
-            # וידוא תקינות המבנה ומילוי ערכי ברירת מחדל אם צריך
-            validated_response = {
-                "summary": {
-                    "assessment": ai_response.get("summary", {}).get("assessment", "לא סופק ניתוח"),
-                    "complexity_level": ai_response.get("summary", {}).get("complexity_level", "medium"),
-                    "estimated_time": ai_response.get("summary", {}).get("estimated_time", "לא סופקה הערכה"),
-                    "key_challenges": ai_response.get("summary", {}).get("key_challenges", [])
-                },
-                "actions": [{
-                    "title": action.get("title", ""),
-                    "priority": action.get("priority", "medium"),
-                    "category": action.get("category", "כללי"),
-                    "based_on_rule_id": action.get("based_on_rule_id", ""),
-                    "required_professionals": action.get("required_professionals", []),
-                    "estimated_cost_range": action.get("estimated_cost_range", "לא סופקה הערכה"),
-                    "explanation": action.get("explanation", "")
-                } for action in ai_response.get("actions", [])],
-                "potential_risks": [{
-                    "risk_type": risk.get("risk_type", "תפעולי"),
-                    "description": risk.get("description", ""),
-                    "impact": risk.get("impact", "medium"),
-                    "mitigation": risk.get("mitigation", "")
-                } for risk in ai_response.get("potential_risks", [])],
-                "tips": [{
-                    "category": tip.get("category", "כללי"),
-                    "tip": tip.get("tip", ""),
-                    "benefit": tip.get("benefit", "")
-                } for tip in ai_response.get("tips", [])],
-                "open_questions": ai_response.get("open_questions", []),
-                "budget_planning": {
-                    "fixed_costs": ai_response.get("budget_planning", {}).get("fixed_costs", []),
-                    "recurring_costs": ai_response.get("budget_planning", {}).get("recurring_costs", []),
-                    "optional_costs": ai_response.get("budget_planning", {}).get("optional_costs", [])
-                }
-            }
-            return validated_response
-            
-        except json.JSONDecodeError as e:
-            print(f"JSON parsing error: {str(e)}")
-            raise ValueError("Invalid JSON response from OpenAI")
-
-    except json.JSONDecodeError as e:
-        print(f"JSON parsing error: {str(e)}")
-        return {
-            "summary": {
-                "assessment": "שגיאה בעיבוד התשובה מה-AI",
-                "complexity_level": "unknown",
-                "estimated_time": "לא ניתן להעריך",
-                "key_challenges": ["תקלה בפענוח התשובה"]
-            },
-            "actions": [],
-            "potential_risks": [],
-            "tips": [],
-            "open_questions": ["נא לפנות לתמיכה - שגיאת JSON"],
-            "budget_planning": {
-                "fixed_costs": [],
-                "recurring_costs": [],
-                "optional_costs": []
-            }
-        }
+            # המקרה הרגיל: פענוח ואימות של כל הקבוצה במעבר אחד
+            reports = [report.model_dump() for report in AIReportBatch.model_validate_json(raw_content).reports]
+        except ValidationError:
+            # גיבוי: ניקוי התשובה ואימות כל דוח בנפרד, כך שדוח פגום אחד לא מפיל את כל הקבוצה
+            try:
+                parsed = orjson.loads(raw_content)
+            except orjson.JSONDecodeError:
+                parsed = orjson.loads(_clean_ai_content(raw_content))
+            reports = [_validate_batch_item(report) for report in parsed.get("reports", [])]
+        return [reports[i] if i < len(reports) else None for i in range(len(batch))]
     except Exception as e:
-        error_message = str(e)
-        print(f"❌ OpenAI API error: {error_message}")
-        
-        # Log more details for debugging
-        if hasattr(e, 'response'):
-            print(f"🔍 API Response status: {e.response.status_code if hasattr(e.response, 'status_code') else 'Unknown'}")
-        
-        # Return the basic report instead of showing technical errors to users
-        print("❌ שגיאה בחיבור ל-ChatGPT - לא יוצג דוח AI")
-        return None  # אין AI - אין דוח
\ No newline at end of file
+        logger.error("OpenAI batch error: %s", e)
+        return [None] * len(batch)
@@ -1,42 +1,304 @@
 # backend/app.py
 import os
 import json
-from typing import Dict, Any, List
+import math
+import hashlib
+import bisect
+import functools
+import threading
+import concurrent.futures
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+import logging
+from typing import Dict, Any, List, Callable, Optional, Tuple, Union, Literal
+import orjson
 from flask import Flask, request, jsonify
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
-from ai_helper import generate_ai_report
+from pydantic import BaseModel, Field, ValidationError, field_validator
+from ai_helper import generate_ai_report, submit_async, ai_job_key, get_cached_report
+
+# Configure logging
+logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO').upper(), format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson - UTF-8 output (Hebrew stays unescaped) with sorted keys like Flask's default"""
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS
+        if kwargs.get("indent"):
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, default=self.default, option=option).decode('utf-8')
+        except TypeError:
+            # orjson לא מסדר מספרים שלמים מעבר ל-64 ביט (למשל "seats": 10**30, שעובר את AssessRequest)
+            return json.dumps(obj, default=self.default, ensure_ascii=False, sort_keys=True, indent=kwargs.get("indent"))
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        return orjson.loads(s)
 
 app = Flask(__name__)
 app.config['JSON_AS_ASCII'] = False
+app.json = OrjsonProvider(app)
 # Configure CORS to allow all origins (for development)
 CORS(app, origins="*", methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"], allow_headers=["Content-Type", "Authorization"])
 
 # --- כללי: מאפייני קלט נתמכים ---
 # features אפשריים: "gas", "delivery", "alcohol", "hood", "meat"
 # area (float > 0), seats (int >= 0)
+ALLOWED_FEATURES = ("gas", "delivery", "alcohol", "hood", "meat")
+
+class AssessRequest(BaseModel):
+    """גוף הבקשה ל-/api/assess - נבדק ומומר פעם אחת (pydantic-core)"""
+    area: Union[int, float] = Field(gt=0)
+    seats: int = Field(ge=0)
+    features: List[Literal[ALLOWED_FEATURES]] = Field(min_length=1)
+
+    @field_validator("seats", mode="before")
+    @classmethod
+    def _truncate_seats(cls, value: Any) -> Any:
+        # כמו int() בבדיקה הקודמת: 12.7 מקומות נחתך ל-12 ולא נדחה (pydantic דוחה שבר). inf/nan ממשיכים לשגיאה
+        return int(value) if isinstance(value, float) and math.isfinite(value) else value
+
+def _assess_error(error: ValidationError) -> str:
+    """Map pydantic validation errors to the API's error messages (same precedence as the checks they replace)"""
+    errors = error.errors()
+    if any(err["type"] == "missing" for err in errors):
+        return "חסרים שדות חובה: area, seats, features"
+    numeric = [err for err in errors if err["loc"][0] in ("area", "seats")]
+    if any(err["type"] not in ("greater_than", "greater_than_equal") for err in numeric):
+        return "שטח ומספר מקומות ישיבה חייבים להיות מספרים תקינים"
+    if numeric:
+        return "שטח חייב להיות גדול מ-0 ומספר מקומות ישיבה לא יכול להיות שלילי"
+    if any(err["type"] == "list_type" for err in errors):
+        return "מאפיינים חייבים להיות רשימה"
+    if any(err["type"] == "too_short" for err in errors):
+        return "חובה לבחור לפחות מאפיין אחד"
+    invalid_features = [str(err["input"]) for err in errors if err["type"] == "literal_error"]
+    return f"מאפיינים לא תקינים: {', '.join(invalid_features)}. מאפיינים מותרים: {', '.join(ALLOWED_FEATURES)}"
+
+# הכללים מקומפלים פעם אחת בטעינה לזוגות (תנאי מקומפל, תצוגת הכלל לצ'קליסט) - ברשימה נפרדת
+# ולא בתוך הכללים עצמם, כדי ש-/api/rules יישאר JSON נקי
+RuleMatcher = Callable[[Optional[float], Optional[int], int], bool]
+
+@dataclass(frozen=True)
+class RuleSet:
+    """
+    הכללים הטעונים וכל מה שנגזר מהם. נבנה במלואו בטעינה ומוחלף בהצבה אחת של _RULESET, ובקשה קוראת
+    את _RULESET פעם אחת - כך שגם בזמן טעינה מחדש היא רואה ביטים, כללים מקומפלים, אינדקס, ספים ומטמונים
+    של אותה גרסת כללים (המטמונים שייכים לגרסה, ותוצאה ישנה לא יכולה לנחות במטמון של הכללים החדשים)
+    """
+    rules: List[Dict[str, Any]]
+    # (mtime, size) של קובץ הכללים - None כשהכללים החלופיים בשימוש
+    file_stat: Optional[Tuple[int, int]]
+    # גיבוב תוכן הכללים - חלק מה-ETag של /api/assess ו-/api/rules
+    digest: bytes
+    compiled: List[Tuple[RuleMatcher, Dict[str, Any]]]
+    # כל מאפיין (המותרים + אלה שמופיעים בכללים) מקבל ביט - בדיקות features_any/features_all הן AND על מספר שלם.
+    # מאפיין שלא מוכר לכללים לא מקבל ביט, ולכן גם לא משפיע על ההתאמה
+    feature_bits: Dict[str, int]
+    # אינדקס הפוך לפי מאפיין: כלל שדורש מאפיין (features_any/features_all) נבדק רק כשאחד המאפיינים שלו קיים בבקשה
+    ungated: List[int]
+    by_feature: Dict[str, List[int]]
+    indexed_mask: int
+    # ספי השטח/מקומות הישיבה שמופיעים בכללים. שני ערכים באותו "אזור" בין ספים מתאימים בדיוק לאותם כללים,
+    # ולכן תוצאת ההתאמה נשמרת לפי (אזור שטח, אזור מקומות, המאפיינים שהכללים מתייחסים אליהם)
+    area_thresholds: List[float]
+    seat_thresholds: List[int]
+    rule_mask: int
+    # רשימת המועמדים לכל צירוף של מאפיינים מאונדקסים, ו-LRU חסום של תוצאות ההתאמה
+    candidate_cache: Dict[int, List[Tuple[RuleMatcher, Dict[str, Any]]]] = field(default_factory=dict)
+    match_cache: "OrderedDict[Tuple, Tuple[Dict[str, Any], ...]]" = field(default_factory=OrderedDict)
+
+    @classmethod
+    def build(cls, rules: List[Dict[str, Any]], file_stat: Optional[Tuple[int, int]] = None) -> "RuleSet":
+        conds = [rule.get("if", {}) for rule in rules]
+        rule_features = {feature for cond in conds for key in ("features_any", "features_all") for feature in cond.get(key) or ()}
+        frequency = _feature_frequency(conds)
+        feature_bits = _feature_bits(rule_features.union(ALLOWED_FEATURES))
+        ungated, by_feature = _index_rules_by_feature(rules, frequency)
+        return cls(
+            rules=rules,
+            file_stat=file_stat,
+            digest=hashlib.blake2b(orjson.dumps(rules), digest_size=16).digest(),
+            compiled=[(_compile_cond(cond, feature_bits, frequency), _rule_view(rule)) for cond, rule in zip(conds, rules)],
+            feature_bits=feature_bits,
+            ungated=ungated,
+            by_feature=by_feature,
+            indexed_mask=_feature_mask(by_feature, feature_bits),
+            area_thresholds=sorted({cond[key] for cond in conds for key in ("area_min", "area_max") if key in cond}),
+            seat_thresholds=sorted({cond[key] for cond in conds for key in ("seats_min", "seats_max") if key in cond}),
+            rule_mask=_feature_mask(rule_features, feature_bits)
+        )
+
+_MATCH_CACHE_MAX = 4096
+_MATCH_CACHE_LOCK = threading.Lock()
+
+# ה-ETag של הערכה חלש (W/): הוא מגבב את הבקשה ולא את התשובה, ושני דוחות AI שונים לאותה בקשה שקולים סמנטית בלבד.
+# private - התשובה כוללת דוח AI אישי ולא נשמרת במטמונים משותפים
+ASSESS_CACHE_CONTROL = "private, max-age=300, must-revalidate"
+RULES_CACHE_CONTROL = "no-cache"
+
+# דו"חות AI שממתינים לאיסוף (POST /api/assess?ai=deferred). מזהה העבודה הוא מפתח מטמון ה-AI, כך שבקשה זהה
+# שנשלחת שוב מצטרפת לעבודה שכבר רצה, ו-worker אחר של gunicorn שלא מכיר את העבודה מוצא את הדו"ח המוכן במטמון המשותף
+_AI_JOBS: "OrderedDict[str, concurrent.futures.Future]" = OrderedDict()
+_AI_JOBS_MAX = 1024
+_AI_JOBS_LOCK = threading.Lock()
+# כמה זמן לחכות לדו"ח במצב deferred לפני שמחזירים "pending" - מספיק לפגיעה במטמון ה-AI
+AI_INLINE_WAIT = float(os.getenv('AI_INLINE_WAIT', '0.05'))
+
+def _always(area, seats, mask) -> bool:
+    return True
 
-# Global variable to hold restaurant rules
-RESTAURANT_RULES: List[Dict[str, Any]] = []
+def _feature_bits(features) -> Dict[str, int]:
+    """Assign one bit per feature name (sorted, so the same vocabulary always gets the same bits)"""
+    return {feature: 1 << index for index, feature in enumerate(sorted(set(features)))}
+
+def _feature_mask(features, feature_bits: Dict[str, int]) -> int:
+    """OR of the bits of the given features - features outside the vocabulary contribute nothing"""
+    mask = 0
+    for feature in features:
+        mask |= feature_bits.get(feature, 0)
+    return mask
+
+def _feature_frequency(conds: List[Dict[str, Any]]) -> Counter:
+    """How many rule conditions mention each feature (a rough estimate of how often a feature check passes)"""
+    return Counter(feature for cond in conds for key in ("features_any", "features_all") for feature in cond.get(key) or ())
+
+def _compile_cond(cond: Dict[str, Any], feature_bits: Dict[str, int], frequency: Optional[Counter] = None) -> RuleMatcher:
+    """Compile a rule's "if" dict into a single predicate (area, seats, feature mask) -> bool"""
+    checks = []
+    if "area_min" in cond:
+        area_min = cond["area_min"]
+        checks.append(lambda area, seats, mask: area is not None and area >= area_min)
+    if "area_max" in cond:
+        area_max = cond["area_max"]
+        checks.append(lambda area, seats, mask: area is not None and area <= area_max)
+    if "seats_min" in cond:
+        seats_min = cond["seats_min"]
+        checks.append(lambda area, seats, mask: seats is not None and seats >= seats_min)
+    if "seats_max" in cond:
+        seats_max = cond["seats_max"]
+        checks.append(lambda area, seats, mask: seats is not None and seats <= seats_max)
+    # בדיקות המאפיינים אחרי המספריות (האינדקס כבר הבטיח שמאפיין השער קיים), והסלקטיבית מביניהן קודם:
+    # features_all עובר לכל היותר כמו הנדיר במאפייניו, features_any בערך כמו סכום השכיחויות
+    frequency = frequency or Counter()
+    feature_checks = []
+    if "features_any" in cond:
+        any_mask = _feature_mask(cond["features_any"], feature_bits)
+        feature_checks.append((
+            sum(frequency[feature] for feature in cond["features_any"]),
+            lambda area, seats, mask: mask & any_mask != 0
+        ))
+    if "features_all" in cond:
+        all_mask = _feature_mask(cond["features_all"], feature_bits)
+        feature_checks.append((
+            min((frequency[feature] for feature in cond["features_all"]), default=0),
+            lambda area, seats, mask: mask & all_mask == all_mask
+        ))
+    feature_checks.sort(key=lambda item: item[0])
+    checks.extend(check for _, check in feature_checks)
+
+    if not checks:
+        return _always
+    # שרשור הבדיקות ל-and מקונן - בלי generator ו-all() בכל קריאה
+    predicate = checks[0]
+    for check in checks[1:]:
+        predicate = _both(predicate, check)
+    return predicate
+
+def _both(first: RuleMatcher, second: RuleMatcher) -> RuleMatcher:
+    return lambda area, seats, mask: first(area, seats, mask) and second(area, seats, mask)
 
 def load_restaurant_rules():
     """Load restaurant rules from JSON file"""
-    global RESTAURANT_RULES
+    global _RULESET
     
     # Path to rules file
     rules_path = os.path.join(os.path.dirname(__file__), "rules", "restaurant_rules.json")
     
     try:
         if os.path.exists(rules_path):
-            with open(rules_path, 'r', encoding='utf-8') as f:
-                RESTAURANT_RULES = json.load(f)
-            print(f"Loaded {len(RESTAURANT_RULES)} rules from {rules_path}")
+            stat = os.stat(rules_path)
+            file_stat = (stat.st_mtime_ns, stat.st_size)
+            if _RULESET is not None and file_stat == _RULESET.file_stat:
+                # הקובץ לא השתנה מאז הטעינה הקודמת - הכללים המקומפלים והמטמונים נשארים בתוקף
+                logger.info("Rules file unchanged, keeping %d loaded rules", len(_RULESET.rules))
+                return
+            with open(rules_path, 'rb') as f:
+                rules = orjson.loads(f.read())
+            logger.info("Loaded %d rules from %s", len(rules), rules_path)
         else:
-            print(f"Rules file not found at {rules_path}, using fallback rules")
-            RESTAURANT_RULES = get_fallback_rules()
+            logger.warning("Rules file not found at %s, using fallback rules", rules_path)
+            rules, file_stat = get_fallback_rules(), None
     except Exception as e:
-        print(f"Error loading rules from {rules_path}: {e}")
-        print("Using fallback rules")
-        RESTAURANT_RULES = get_fallback_rules()
+        logger.error("Error loading rules from %s: %s - using fallback rules", rules_path, e)
+        rules, file_stat = get_fallback_rules(), None
+
+    # הכל נבנה לפני ההחלפה - בקשות שרצות עכשיו ממשיכות עם הגרסה הקודמת עד שהן מסתיימות
+    _RULESET = RuleSet.build(rules, file_stat)
+
+def _threshold_region(value: Optional[float], thresholds: List[float]) -> Optional[Tuple[int, bool]]:
+    """(position among the thresholds, equal to that threshold) - identical for all values that compare alike"""
+    if value is None:
+        return None
+    index = bisect.bisect_left(thresholds, value)
+    return index, index < len(thresholds) and thresholds[index] == value
+
+def _index_rules_by_feature(rules: List[Dict[str, Any]], frequency: Counter) -> Tuple[List[int], Dict[str, List[int]]]:
+    """Split rule indices into ungated rules and per-feature buckets (a rule sits only under features it needs)"""
+    ungated: List[int] = []
+    by_feature: Dict[str, List[int]] = {}
+    for index, rule in enumerate(rules):
+        cond = rule.get("if", {})
+        if cond.get("features_all"):
+            # כל המאפיינים נדרשים - מספיק לאנדקס לפי הנדיר שבהם
+            gates = [min(cond["features_all"], key=frequency.__getitem__)]
+        elif cond.get("features_any"):
+            gates = set(cond["features_any"])
+        else:
+            ungated.append(index)
+            continue
+        for feature in gates:
+            by_feature.setdefault(feature, []).append(index)
+    return ungated, by_feature
+
+def _candidate_rules(ruleset: RuleSet, mask: int) -> List[Tuple[RuleMatcher, Dict[str, Any]]]:
+    """Compiled rules that can match a request with this feature mask, in rule-file order"""
+    key = mask & ruleset.indexed_mask
+    candidates = ruleset.candidate_cache.get(key)
+    if candidates is None:
+        gates = [feature for feature in ruleset.by_feature if key & ruleset.feature_bits[feature]]
+        indices = set(ruleset.ungated).union(*(ruleset.by_feature[feature] for feature in gates))
+        candidates = ruleset.candidate_cache[key] = [ruleset.compiled[index] for index in sorted(indices)]
+    return candidates
+
+def _cached_matches(ruleset: RuleSet, match_key: Tuple, area, seats, feature_mask: int) -> Tuple[Dict[str, Any], ...]:
+    """Matched checklist views for a request, from the bounded LRU keyed by threshold regions and feature mask"""
+    match_cache = ruleset.match_cache
+    with _MATCH_CACHE_LOCK:
+        cached = match_cache.get(match_key)
+        if cached is not None:
+            match_cache.move_to_end(match_key)
+            return cached
+    cached = tuple(view for matches, view in _candidate_rules(ruleset, feature_mask) if matches(area, seats, feature_mask))
+    with _MATCH_CACHE_LOCK:
+        match_cache[match_key] = cached
+        if len(match_cache) > _MATCH_CACHE_MAX:
+            match_cache.popitem(last=False)
+    return cached
+
+def _rule_view(rule: Dict[str, Any]) -> Dict[str, Any]:
+    """The fields of a rule returned in the checklist (built once per rule, shared read-only)"""
+    return {
+        "id": rule["id"],
+        "category": rule["category"],
+        "title": rule["title"],
+        "status": rule["status"],
+        "note": rule.get("note", ""),
+        "section_ref": rule.get("section_ref", "")
+    }
 
 def get_fallback_rules():
     """Fallback rules in case JSON file is not available"""
@@ -144,35 +406,71 @@ def get_fallback_rules():
 ]
 
 # Load rules on startup
+_RULESET: Optional[RuleSet] = None
 load_restaurant_rules()
 
-def translate_features(features: List[str]) -> List[str]:
-    """תרגום מאפיינים מאנגלית לעברית"""
-    feature_translations = {
-        "gas": "שימוש בגז",
-        "delivery": "שירות משלוחים", 
-        "alcohol": "הגשת אלכוהול",
-        "hood": "מנדף מטבח מקצועי",
-        "meat": "הגשת בשר"
-    }
-    return [feature_translations.get(feature, feature) for feature in features]
+_FEATURE_TRANSLATIONS = {
+    "gas": "שימוש בגז",
+    "delivery": "שירות משלוחים",
+    "alcohol": "הגשת אלכוהול",
+    "hood": "מנדף מטבח מקצועי",
+    "meat": "הגשת בשר"
+}
+
+@functools.lru_cache(maxsize=64)
+def translate_features(features: Tuple[str, ...]) -> Tuple[str, ...]:
+    """תרגום מאפיינים מאנגלית לעברית (תוצאה בלתי ניתנת לשינוי, נשמרת במטמון)"""
+    return tuple(_FEATURE_TRANSLATIONS.get(feature, feature) for feature in features)
 
 def rule_matches(cond: Dict[str, Any], payload: Dict[str, Any]) -> bool:
-    area = payload.get("area")
-    seats = payload.get("seats")
-    features = set(payload.get("features") or [])
-    if "area_min" in cond and (area is None or area < cond["area_min"]): return False
-    if "area_max" in cond and (area is None or area > cond["area_max"]): return False
-    if "seats_min" in cond and (seats is None or seats < cond["seats_min"]): return False
-    if "seats_max" in cond and (seats is None or seats > cond["seats_max"]): return False
-    if "features_any" in cond and features.isdisjoint(set(cond["features_any"])): return False
-    if "features_all" in cond and not set(cond["features_all"]).issubset(features): return False
-    return True
+    features = payload.get("features") or []
+    feature_bits = _feature_bits([*cond.get("features_any", ()), *cond.get("features_all", ()), *features])
+    return _compile_cond(cond, feature_bits)(payload.get("area"), payload.get("seats"), _feature_mask(features, feature_bits))
+
+def _ai_job(job_id: str, payload: Dict[str, Any], matched_rules: List[Dict[str, Any]]) -> concurrent.futures.Future:
+    """The running (or successful) AI report job for this request, starting a new one if needed"""
+    with _AI_JOBS_LOCK:
+        future = _AI_JOBS.get(job_id)
+        if future is None or (future.done() and _collect_ai_report(future) is None):
+            # אין עבודה, או שהקודמת נכשלה - מנסים שוב
+            future = _AI_JOBS[job_id] = submit_async(generate_ai_report(payload, matched_rules))
+        _AI_JOBS.move_to_end(job_id)
+        if len(_AI_JOBS) > _AI_JOBS_MAX:
+            _AI_JOBS.popitem(last=False)
+    return future
 
-def evaluate_restaurant(payload: Dict[str, Any]) -> Dict[str, Any]:
+def _collect_ai_report(ai_future: concurrent.futures.Future) -> Optional[Dict[str, Any]]:
+    """The AI report of a finished job, or None if there is no AI or the call failed"""
+    try:
+        return ai_future.result()
+    except Exception as e:
+        logger.error("שגיאה בחיבור לChatGPT: %s", e)
+        return None
+
+def _attach_ai_report(result: Dict[str, Any], ai_report: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Add the AI report (or the "no AI" status) to a response dict"""
+    has_real_ai = ai_report is not None
+    if has_real_ai:
+        # יש דוח AI אמיתי מChatGPT
+        result['ai_report'] = ai_report
+        logger.debug("דוח AI נוצר בהצלחה מChatGPT")
+    else:
+        logger.debug("אין חיבור לChatGPT - לא יוצג דוח AI")
+
+    # הוסף מידע על מצב ה-AI האמיתי
+    result['has_real_ai'] = has_real_ai
+    if not has_real_ai:
+        result['ai_status'] = "אין חיבור לChatGPT - דוח AI לא זמין"
+        # אל תוסיף ai_report בכלל כשאין AI אמיתי!
+    return result
+
+def evaluate_restaurant(payload: Dict[str, Any], defer_ai: bool = False, ruleset: Optional[RuleSet] = None) -> Dict[str, Any]:
     """
-    מקבל נתוני מסעדה ומחזיר את הדרישות הרגולטוריות המתאימות
+    מקבל נתוני מסעדה ומחזיר את הדרישות הרגולטוריות המתאימות.
+    עם defer_ai=True לא מחכים ל-ChatGPT: אם הדו"ח לא מוכן מיד מוחזרים ai_status="pending" ו-ai_job
+    לאיסוף דרך GET /api/ai-report/<ai_job>
     """
+    ruleset = ruleset or _RULESET
     
     # בדיקת תקינות קלט בסיסית
     if not all(k in payload for k in ['area', 'seats', 'features']):
@@ -180,36 +478,36 @@ def evaluate_restaurant(payload: Dict[str, Any]) -> Dict[str, Any]:
     
     area = payload['area']
     seats = payload['seats'] 
-    features = set(payload['features'])
+    features = frozenset(payload['features'])
+    feature_mask = _feature_mask(features, ruleset.feature_bits)
+
+    # 1. התאמת כללים לפי המאפיינים
+    match_key = (
+        _threshold_region(area, ruleset.area_thresholds),
+        _threshold_region(seats, ruleset.seat_thresholds),
+        feature_mask & ruleset.rule_mask
+    )
+    matched_rules = list(_cached_matches(ruleset, match_key, area, seats, feature_mask))
+
+    # 2. הפקת דו"ח AI מתחילה כבר עכשיו ברקע - שאר הסיכום נבנה בזמן שהבקשה ל-ChatGPT בדרך
+    job_id = ai_job_key(payload, matched_rules) if defer_ai else None
+    ai_future = _ai_job(job_id, payload, matched_rules) if defer_ai else submit_async(generate_ai_report(payload, matched_rules))
 
-    # 1. קביעת מסלול כבאות
+    # 3. קביעת מסלול כבאות
     is_small = area <= 150 and seats <= 50
     fire_track = "תצהיר (פרק 5)" if is_small else "מסלול מלא (פרק 6)"
     
-    # 2. קביעת דרישות משטרה
+    # 4. קביעת דרישות משטרה
     has_alcohol = "alcohol" in features
     high_capacity = seats > 200
     police_required = has_alcohol or high_capacity
     police_note = "פטור מדרישות משטרה (≤200 מקומות וללא אלכוהול)" if not police_required else "חלים תנאי משטרה"
 
-    # 3. התאמת כללים לפי המאפיינים
-    matched_rules = []
-    for rule in RESTAURANT_RULES:
-        if rule_matches(rule.get("if", {}), payload):
-            matched_rules.append({
-                "id": rule["id"],
-                "category": rule["category"], 
-                "title": rule["title"],
-                "status": rule["status"],
-                "note": rule.get("note", ""),
-                "section_ref": rule.get("section_ref", "")
-            })
-
     summary = {
         "type": "restaurant",
         "area": area,
         "seats": seats,
-        "features": translate_features(list(features)),
+        "features": translate_features(tuple(sorted(features))),
         "police": police_note,
         "fire_track": fire_track
     }
@@ -219,29 +517,23 @@ def evaluate_restaurant(payload: Dict[str, Any]) -> Dict[str, Any]:
         "checklist": matched_rules
     }
 
-    # 4. הפקת דו"ח AI - רק אם יש חיבור אמיתי לChatGPT
-    has_real_ai = False
-    
-    try:
-        ai_report = generate_ai_report(payload, matched_rules)
-        if ai_report is not None:
-            # יש דוח AI אמיתי מChatGPT
-            has_real_ai = True
-            result['ai_report'] = ai_report
-            print("✅ דוח AI נוצר בהצלחה מChatGPT")
-        else:
-            print("❌ אין חיבור לChatGPT - לא יוצג דוח AI")
-            
-    except Exception as e:
-        print(f"❌ שגיאה בחיבור לChatGPT: {str(e)}")
-    
-    # הוסף מידע על מצב ה-AI האמיתי
-    result['has_real_ai'] = has_real_ai
-    if not has_real_ai:
-        result['ai_status'] = "אין חיבור לChatGPT - דוח AI לא זמין"
-        # אל תוסיף ai_report בכלל כשאין AI אמיתי!
+    # 5. איסוף דו"ח ה-AI - רק אם יש חיבור אמיתי לChatGPT
+    if defer_ai and concurrent.futures.wait([ai_future], timeout=AI_INLINE_WAIT).not_done:
+        result['has_real_ai'] = False
+        result['ai_status'] = "pending"
+        result['ai_job'] = job_id
+        return result
 
-    return result
+    return _attach_ai_report(result, _collect_ai_report(ai_future))
+
+def _assess_etag(data: Dict[str, Any], ruleset: RuleSet) -> str:
+    """ETag for an assessment: the loaded rules + the canonicalized request body"""
+    try:
+        body = orjson.dumps(data, option=orjson.OPT_SORT_KEYS)
+    except TypeError:
+        # מספר שלם מעבר ל-64 ביט - גוף תקין, רק ש-orjson לא מסדר אותו
+        body = json.dumps(data, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    return hashlib.blake2b(ruleset.digest + body, digest_size=8).hexdigest()
 
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -250,49 +542,60 @@ def health_check():
 @app.post("/api/assess")
 def assess():
     try:
-        data = request.get_json(silent=True) or {}
-        
-        # Validate required fields exist
-        if not all(k in data for k in ['area', 'seats', 'features']):
-            return jsonify({"error": "חסרים שדות חובה: area, seats, features"}), 400
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            data = {}
         
-        # Validate area and seats are valid numbers
+        # Validate and coerce the payload in one pass
         try:
-            area = float(data['area'])
-            seats = int(data['seats'])
-            if area <= 0 or seats < 0:
-                return jsonify({"error": "שטח חייב להיות גדול מ-0 ומספר מקומות ישיבה לא יכול להיות שלילי"}), 400
-        except (ValueError, TypeError):
-            return jsonify({"error": "שטח ומספר מקומות ישיבה חייבים להיות מספרים תקינים"}), 400
-        
-        # Validate features
-        features = data.get('features', [])
-        if not isinstance(features, list):
-            return jsonify({"error": "מאפיינים חייבים להיות רשימה"}), 400
-        
-        if not features or len(features) == 0:
-            return jsonify({"error": "חובה לבחור לפחות מאפיין אחד"}), 400
-        
-        # Validate that features are from the allowed list
-        allowed_features = ['gas', 'delivery', 'alcohol', 'hood', 'meat']
-        invalid_features = [f for f in features if f not in allowed_features]
-        if invalid_features:
-            return jsonify({"error": f"מאפיינים לא תקינים: {', '.join(invalid_features)}. מאפיינים מותרים: {', '.join(allowed_features)}"}), 400
+            data = AssessRequest.model_validate(data).model_dump()
+        except ValidationError as e:
+            return jsonify({"error": _assess_error(e)}), 400
         
         # Log the received data for debugging
-        print(f"Received data: {data}")
+        logger.debug("Received data: %s", data)
+        
+        # הלקוח כבר מחזיק תשובה מלאה לאותה בקשה ולאותם כללים. ב-POST תנאי If-None-Match שמתקיים
+        # מחזיר 412 ולא 304 (RFC 9110 סעיף 13.1.2) - ההשוואה חלשה, כמו שנדרש ב-If-None-Match
+        ruleset = _RULESET
+        etag = _assess_etag(data, ruleset)
+        if request.if_none_match.contains_weak(etag):
+            response = jsonify({"error": "התשובה לבקשה זו כבר שמורה אצל הלקוח"})
+            response.status_code = 412
+            response.set_etag(etag, weak=True)
+            return response
         
-        result = evaluate_restaurant(data)
+        result = evaluate_restaurant(data, defer_ai=request.args.get('ai') == 'deferred', ruleset=ruleset)
         
-        # Log the result for debugging
-        print(f"Evaluation result: {result}")
+        # Log the outcome for debugging - the full result (with the AI report) is too large to log per request
+        logger.debug("Evaluation result: %d rules, has_real_ai=%s", len(result.get('checklist', ())), result.get('has_real_ai'))
         
-        return jsonify(result)
+        response = jsonify(result)
+        # רק תשובה מלאה (עם דוח AI) ניתנת לשמירה - תשובה בלי AI צריכה להתחשב שוב כשה-AI יחזור
+        if result.get('has_real_ai'):
+            response.set_etag(etag, weak=True)
+            response.headers['Cache-Control'] = ASSESS_CACHE_CONTROL
+        return response
         
     except Exception as e:
-        print(f"Error in assess endpoint: {str(e)}")
+        logger.exception("Error in assess endpoint: %s", e)
         return jsonify({"error": f"שגיאה בעיבוד הבקשה: {str(e)}"}), 500
 
+@app.get("/api/ai-report/<job_id>")
+def get_ai_report(job_id: str):
+    """AI report of a deferred assessment: 202 while it is still being generated"""
+    with _AI_JOBS_LOCK:
+        ai_future = _AI_JOBS.get(job_id)
+    if ai_future is not None and not ai_future.done():
+        return jsonify({"has_real_ai": False, "ai_status": "pending", "ai_job": job_id}), 202
+    ai_report = _collect_ai_report(ai_future) if ai_future is not None else None
+    if ai_report is None:
+        # העבודה רצה ב-worker אחר (או כבר נדחקה מ-_AI_JOBS) - דו"ח מוכן נמצא במטמון ה-AI המשותף
+        ai_report = get_cached_report(job_id)
+    if ai_future is None and ai_report is None:
+        return jsonify({"error": "דוח AI לא נמצא - יש לשלוח את הבקשה מחדש"}), 404
+    return jsonify(_attach_ai_report({}, ai_report))
+
 @app.post("/api/reload-rules")
 def reload_rules():
     """Reload rules from JSON file (development endpoint)"""
@@ -301,10 +604,10 @@ def reload_rules():
         return jsonify({
             "ok": True, 
             "message": "Rules reloaded successfully",
-            "count": len(RESTAURANT_RULES)
+            "count": len(_RULESET.rules)
         })
     except Exception as e:
-        print(f"Error reloading rules: {str(e)}")
+        logger.error("Error reloading rules: %s", e)
         return jsonify({
             "ok": False,
             "error": f"Failed to reload rules: {str(e)}"
@@ -313,10 +616,20 @@ def reload_rules():
 @app.get("/api/rules")
 def get_rules():
     """Get current rules (development endpoint)"""
-    return jsonify({
-        "count": len(RESTAURANT_RULES),
-        "rules": RESTAURANT_RULES
-    })
+    # הכללים משתנים רק בטעינה מחדש - הלקוח מאמת מול גיבוב הכללים ומקבל 304 בלי לסדר אותם שוב
+    ruleset = _RULESET
+    etag = ruleset.digest.hex()
+    if etag in request.if_none_match:
+        response = app.response_class(status=304)
+    else:
+        response = jsonify({
+            "count": len(ruleset.rules),
+            "rules": ruleset.rules
+        })
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = RULES_CACHE_CONTROL
+    return response
 
 if __name__ == '__main__':
-    app.run(port=8000, debug=True)
+    # שרת פיתוח בלבד (FLASK_DEBUG=1 מפעיל reloader ו-debugger) - בפרודקשן: gunicorn app:app (ראו gunicorn.conf.py)
+    app.run(port=int(os.getenv('PORT', 8000)))
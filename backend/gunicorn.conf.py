@@ -0,0 +1,11 @@
+# Production server for the backend:
+#   cd backend && gunicorn app:app
+# Every /api/assess waits on OpenAI, so each worker runs a thread pool -
+# requests are served concurrently instead of one at a time like `python app.py`.
+import os
+
+bind = os.getenv('BIND', '0.0.0.0:8000')
+worker_class = 'gthread'
+workers = int(os.getenv('WEB_WORKERS', 4))
+threads = int(os.getenv('WEB_THREADS', 8))
+timeout = 60
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Basic tests for the AI helper module
+
+These tests cover the deterministic parts of ai_helper (caching and the
+basic report) and never call the OpenAI API.
+"""
+
+import sys
+import os
+import re
+import asyncio
+import json
+
+# Add parent directory to path to import backend modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import ai_helper
+from ai_helper import _cache_key, _cache_get, _cache_set, create_basic_report
+
+RULES = [
+    {"id": "gas-cert", "category": "גז (גפ\"מ)", "title": "אישור מתקין גפ\"מ ועמידה בת״י 158", "note": ""},
+    {"id": "fire-affidavit", "category": "כבאות והצלה (תצהיר)", "title": "מסלול תצהיר – עד 50 איש ועד 150 מ״ר", "note": ""},
+]
+
+def test_cache_key_is_canonical():
+    """Same business in a different feature order maps to the same key"""
+    print("Testing cache key canonicalization...")
+
+    key_a = _cache_key({"area": 100, "seats": 20, "features": ["gas", "delivery"]}, RULES)
+    key_b = _cache_key({"area": 100, "seats": 20, "features": ["delivery", "gas"]}, list(reversed(RULES)))
+    key_c = _cache_key({"area": 101, "seats": 20, "features": ["gas", "delivery"]}, RULES)
+
+    assert key_a == key_b
+    assert key_a != key_c
+
+    print("✅ Cache key tests passed")
+
+def test_cache_key_covers_rule_text():
+    """Editing a matched rule's category or note changes the key (both go into the prompt and the basic report)"""
+    print("Testing cache key rule fields...")
+
+    business = {"area": 100, "seats": 20, "features": ["gas"]}
+    key = _cache_key(business, RULES)
+    edited_note = [dict(RULES[0], note="הערה חדשה"), RULES[1]]
+    edited_category = [dict(RULES[0], category="גז"), RULES[1]]
+
+    assert _cache_key(business, edited_note) != key
+    assert _cache_key(business, edited_category) != key
+    assert create_basic_report(business, edited_category)["actions"][0]["category"] == "גז"
+
+    print("✅ Cache key rule field tests passed")
+
+def test_disk_cache_roundtrip(tmp_path, monkeypatch):
+    """A stored report is returned as-is on the next lookup"""
+    print("Testing disk cache roundtrip...")
+
+    monkeypatch.setattr(ai_helper, "AI_CACHE_PATH", str(tmp_path / "ai_reports.sqlite"))
+    monkeypatch.setattr(ai_helper, "_cache_db", None)
+    monkeypatch.setattr(ai_helper, "_AI_REPORT_MEMORY", ai_helper.OrderedDict())
+
+    assert _cache_get("missing") is None
+    _cache_set("key", {"summary": {"assessment": "בדיקה"}})
+    assert _cache_get("key") == {"summary": {"assessment": "בדיקה"}}
+
+    print("✅ Disk cache tests passed")
+
+def test_cache_expiry_and_isolation(tmp_path, monkeypatch):
+    """Cached reports are private copies and expire after AI_CACHE_TTL"""
+    print("Testing cache TTL...")
+
+    monkeypatch.setattr(ai_helper, "AI_CACHE_PATH", str(tmp_path / "ai_reports.sqlite"))
+    monkeypatch.setattr(ai_helper, "_cache_db", None)
+    monkeypatch.setattr(ai_helper, "_AI_REPORT_MEMORY", ai_helper.OrderedDict())
+
+    _cache_set("key", {"open_questions": ["שאלה"]})
+    _cache_get("key")["open_questions"].clear()
+    assert _cache_get("key") == {"open_questions": ["שאלה"]}
+
+    # Served from disk once the in-memory entry is gone
+    ai_helper._AI_REPORT_MEMORY.clear()
+    assert _cache_get("key") == {"open_questions": ["שאלה"]}
+
+    monkeypatch.setattr(ai_helper, "AI_CACHE_TTL", -1)
+    assert _cache_get("key") is None
+
+    print("✅ Cache TTL tests passed")
+
+def test_basic_report_is_fresh_copy():
+    """Repeated basic reports are equal but never share mutable state"""
+    print("Testing basic report copies...")
+
+    business = {"area": 120, "seats": 45, "features": ["gas", "delivery"]}
+    first = create_basic_report(business, RULES)
+    first["actions"].clear()
+    second = create_basic_report(business, RULES)
+
+    assert second["actions"]
+    assert second["summary"]["complexity_level"] == "low"
+
+    print("✅ Basic report copy tests passed")
+
+def test_basic_report_caps_actions():
+    """The basic report never lists more than 12 actions, even with many categories"""
+    print("Testing action cap...")
+
+    rules = [
+        {"id": f"rule-{i}", "category": f"קטגוריה {i}", "title": "דרישה כללית לבדיקת הגבלה", "note": ""}
+        for i in range(20)
+    ]
+    report = create_basic_report({"area": 80, "seats": 20, "features": []}, rules)
+
+    assert len(report["actions"]) == 12
+
+    print("✅ Action cap tests passed")
+
+def _isolated_cache(tmp_path, monkeypatch):
+    """Point the AI cache at an empty temp database and pretend an OpenAI client exists"""
+    monkeypatch.setattr(ai_helper, "AI_CACHE_PATH", str(tmp_path / "ai_reports.sqlite"))
+    monkeypatch.setattr(ai_helper, "_cache_db", None)
+    monkeypatch.setattr(ai_helper, "_AI_REPORT_MEMORY", ai_helper.OrderedDict())
+    monkeypatch.setattr(ai_helper, "_CLIENT", object())
+
+def _fake_completion(calls, batch_reply=None, single_reply=None):
+    """Stand-in for _request_completion: one report per business in the prompt, tagged with its area"""
+    async def fake(prompt, max_tokens, response_format):
+        areas = [int(area) for area in re.findall(r"שטח: (\d+)", prompt)]
+        if response_format is ai_helper._BATCH_RESPONSE_FORMAT:
+            calls.append(("batch", areas))
+            reports = [{"summary": {"assessment": f"area {area}"}} for area in areas]
+            return json.dumps({"reports": batch_reply(reports) if batch_reply else reports})
+        calls.append(("single", areas))
+        report = {"summary": {"assessment": f"area {areas[0]}"}}
+        return json.dumps(single_reply(report) if single_reply else report)
+    return fake
+
+def _pairs(*areas):
+    return [({"area": area, "seats": 10, "features": ["gas"]}, RULES) for area in areas]
+
+def test_batched_reports_keep_input_order(tmp_path, monkeypatch):
+    """Cached and freshly batched reports land at their own index, and every new report is cached"""
+    print("Testing batched report alignment...")
+
+    _isolated_cache(tmp_path, monkeypatch)
+    monkeypatch.setattr(ai_helper, "AI_BATCH_SIZE", 2)
+    calls = []
+    monkeypatch.setattr(ai_helper, "_request_completion", _fake_completion(calls))
+    pairs = _pairs(101, 102, 103, 104, 105)
+    _cache_set(_cache_key(*pairs[2]), {"summary": {"assessment": "cached"}})
+
+    results = asyncio.run(ai_helper.generate_ai_reports_batched(pairs))
+
+    assert [report["summary"]["assessment"] for report in results] == ["area 101", "area 102", "cached", "area 104", "area 105"]
+    assert sorted(calls) == [("batch", [101, 102]), ("batch", [104, 105])]
+    for business_data, rules in pairs:
+        assert _cache_get(_cache_key(business_data, rules)) is not None
+
+    print("✅ Batched report alignment tests passed")
+
+def test_batched_reports_retry_missing_items_alone(tmp_path, monkeypatch):
+    """A report missing from a short batch reply is requested on its own; a failing retry gives None, uncached"""
+    print("Testing batched report fallback...")
+
+    _isolated_cache(tmp_path, monkeypatch)
+    monkeypatch.setattr(ai_helper, "AI_BATCH_SIZE", 3)
+    calls = []
+    fake = _fake_completion(calls, batch_reply=lambda reports: reports[:1], single_reply=lambda report: (
+        "not json" if report["summary"]["assessment"] == "area 203" else report
+    ))
+    monkeypatch.setattr(ai_helper, "_request_completion", fake)
+    pairs = _pairs(201, 202, 203)
+
+    results = asyncio.run(ai_helper.generate_ai_reports_batched(pairs))
+
+    assert results[0]["summary"]["assessment"] == "area 201"
+    assert results[1]["summary"]["assessment"] == "area 202"
+    assert results[2] is None
+    assert sorted(calls) == [("batch", [201, 202, 203]), ("single", [202]), ("single", [203])]
+    assert _cache_get(_cache_key(*pairs[1])) is not None
+    assert _cache_get(_cache_key(*pairs[2])) is None
+
+    print("✅ Batched report fallback tests passed")
+
+def test_batch_reply_with_one_invalid_report(tmp_path, monkeypatch):
+    """One malformed report in a batch reply does not drop the others - only that business is retried"""
+    print("Testing batch reply validation...")
+
+    _isolated_cache(tmp_path, monkeypatch)
+    calls = []
+    def break_second(reports):
+        reports[1] = {"summary": {"key_challenges": "not a list"}}
+        return reports
+    monkeypatch.setattr(ai_helper, "_request_completion", _fake_completion(calls, batch_reply=break_second))
+    pairs = _pairs(301, 302, 303)
+
+    results = asyncio.run(ai_helper.generate_ai_reports_batched(pairs))
+
+    assert [report["summary"]["assessment"] for report in results] == ["area 301", "area 302", "area 303"]
+    assert sorted(calls) == [("batch", [301, 302, 303]), ("single", [302])]
+
+    print("✅ Batch reply validation tests passed")
+
+def test_parallel_reports_keep_input_order(tmp_path, monkeypatch):
+    """generate_ai_reports_batch sends one request per business and returns the reports in input order"""
+    print("Testing parallel reports...")
+
+    _isolated_cache(tmp_path, monkeypatch)
+    calls = []
+    monkeypatch.setattr(ai_helper, "_request_completion", _fake_completion(calls))
+
+    results = asyncio.run(ai_helper.generate_ai_reports_batch(_pairs(401, 402, 403)))
+
+    assert [report["summary"]["assessment"] for report in results] == ["area 401", "area 402", "area 403"]
+    assert sorted(calls) == [("single", [401]), ("single", [402]), ("single", [403])]
+
+    print("✅ Parallel report tests passed")
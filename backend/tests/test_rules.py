@@ -9,12 +9,21 @@ for various business configurations.
 import sys
 import os
 import json
+import time
+import asyncio
 from pathlib import Path
+from itertools import combinations
+from unittest.mock import patch
 
 # Add parent directory to path to import app modules
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from app import rule_matches, evaluate_restaurant, load_restaurant_rules
+import app as backend_app
+from app import app, rule_matches, evaluate_restaurant, load_restaurant_rules, get_fallback_rules, RuleSet, ALLOWED_FEATURES
+
+async def _fake_ai_report(payload, matched_rules):
+    """Stand-in for generate_ai_report - the tests never call OpenAI"""
+    return {"summary": {"assessment": f"{len(matched_rules)} rules"}}
 
 def test_rule_matching():
     """Test individual rule matching logic"""
@@ -193,6 +202,144 @@ def test_complex_features():
     
     print("✅ Complex features test passed")
 
+def test_assess_validation():
+    """Test /api/assess input validation messages"""
+    print("Testing request validation...")
+    
+    client = app.test_client()
+    cases = [
+        ({"seats": 10}, "חסרים שדות חובה"),
+        ({"area": "abc", "seats": 10, "features": ["gas"]}, "חייבים להיות מספרים תקינים"),
+        ({"area": 0, "seats": 10, "features": ["gas"]}, "שטח חייב להיות גדול מ-0"),
+        ({"area": 100, "seats": 10, "features": "gas"}, "מאפיינים חייבים להיות רשימה"),
+        ({"area": 100, "seats": 10, "features": []}, "חובה לבחור לפחות מאפיין אחד"),
+        ({"area": 100, "seats": 10, "features": ["gas", "pool"]}, "מאפיינים לא תקינים: pool"),
+    ]
+    for body, message in cases:
+        response = client.post("/api/assess", json=body)
+        assert response.status_code == 400
+        assert message in response.get_json()["error"]
+    
+    # Fractional seats are truncated like the old int() check, not rejected
+    with patch.object(backend_app, "generate_ai_report", _fake_ai_report):
+        response = client.post("/api/assess", json={"area": 100, "seats": 12.7, "features": ["gas"]})
+        assert response.status_code == 200
+        assert response.get_json()["summary"]["seats"] == 12
+        # 1e30 arrives as a float and truncates to an integer beyond 64 bits - still a normal answer
+        response = client.post("/api/assess", json={"area": 100, "seats": 1e30, "features": ["gas"]})
+        assert response.status_code == 200
+        assert response.get_json()["summary"]["police"] == "חלים תנאי משטרה"
+    
+    print("✅ Request validation tests passed")
+
+async def _slow_fake_ai_report(payload, matched_rules):
+    """Stand-in for a ChatGPT call that takes longer than AI_INLINE_WAIT"""
+    await asyncio.sleep(0.3)
+    return await _fake_ai_report(payload, matched_rules)
+
+def test_assess_deferred_ai():
+    """Test ?ai=deferred returns the checklist right away and the report is collected later (202, then 200)"""
+    print("Testing deferred AI report...")
+    
+    client = app.test_client()
+    body = {"area": 100, "seats": 20, "features": ["gas"]}
+    with patch.object(backend_app, "generate_ai_report", _slow_fake_ai_report):
+        response = client.post("/api/assess?ai=deferred", json=body)
+        data = response.get_json()
+        assert response.status_code == 200
+        assert data["checklist"]
+        assert data["ai_status"] == "pending"
+        job_id = data["ai_job"]
+        
+        report = client.get(f"/api/ai-report/{job_id}")
+        assert report.status_code == 202
+        deadline = time.monotonic() + 5
+        while report.status_code == 202 and time.monotonic() < deadline:
+            time.sleep(0.05)
+            report = client.get(f"/api/ai-report/{job_id}")
+        assert report.status_code == 200
+        ai_report = report.get_json()["ai_report"]
+        assert ai_report["summary"]["assessment"] == f"{len(data['checklist'])} rules"
+    
+    # Another gunicorn worker does not know the job - it serves the report from the shared AI cache
+    backend_app._AI_JOBS.pop(job_id)
+    with patch.object(backend_app, "get_cached_report", {job_id: ai_report}.get):
+        other_worker = client.get(f"/api/ai-report/{job_id}")
+        assert other_worker.status_code == 200
+        assert other_worker.get_json()["ai_report"] == ai_report
+        assert client.get("/api/ai-report/unknown").status_code == 404
+    
+    print("✅ Deferred AI report tests passed")
+
+def test_assess_etag():
+    """Test a full assessment gets a weak private ETag and a matching conditional POST gets 412"""
+    print("Testing assessment ETag...")
+    
+    client = app.test_client()
+    body = {"area": 100, "seats": 20, "features": ["gas"]}
+    with patch.object(backend_app, "generate_ai_report", _fake_ai_report):
+        response = client.post("/api/assess", json=body)
+        assert response.status_code == 200
+        assert response.get_json()["has_real_ai"]
+        etag = response.headers["ETag"]
+        assert etag.startswith('W/"')
+        assert response.headers["Cache-Control"].startswith("private")
+        
+        # RFC 9110: a POST whose If-None-Match matches is 412, never 304
+        conditional = client.post("/api/assess", json=body, headers={"If-None-Match": etag})
+        assert conditional.status_code == 412
+        assert conditional.headers["ETag"] == etag
+        
+        # A different business does not match the validator
+        other = client.post("/api/assess", json=dict(body, seats=21), headers={"If-None-Match": etag})
+        assert other.status_code == 200
+        assert other.headers["ETag"] != etag
+    
+    # Integers beyond 64 bits are valid input - orjson cannot serialize them, so the ETag and the JSON fall back to json
+    huge = dict(body, seats=10**30)
+    assert backend_app._assess_etag(huge, backend_app._RULESET) != backend_app._assess_etag(body, backend_app._RULESET)
+    assert json.loads(app.json.dumps(huge)) == huge
+    
+    print("✅ Assessment ETag tests passed")
+
+def _reference_matches(cond, payload):
+    """Plain interpreted matcher (the original rule_matches) - independent of the compiled predicates under test"""
+    area = payload.get("area")
+    seats = payload.get("seats")
+    features = set(payload.get("features") or [])
+    if "area_min" in cond and (area is None or area < cond["area_min"]): return False
+    if "area_max" in cond and (area is None or area > cond["area_max"]): return False
+    if "seats_min" in cond and (seats is None or seats < cond["seats_min"]): return False
+    if "seats_max" in cond and (seats is None or seats > cond["seats_max"]): return False
+    if "features_any" in cond and features.isdisjoint(set(cond["features_any"])): return False
+    if "features_all" in cond and not set(cond["features_all"]).issubset(features): return False
+    return True
+
+def _boundary_values(thresholds, steps):
+    """Every threshold, its neighbours on both sides, and values far below/above all thresholds"""
+    values = {1, 10_000}
+    for threshold in thresholds:
+        values.update(threshold + step for step in steps)
+    return sorted(value for value in values if value > 0)
+
+def test_checklist_matches_reference_at_thresholds():
+    """Test evaluate_restaurant (compiled rules, index, threshold regions, match LRU) agrees with a plain matcher at every threshold"""
+    print("Testing checklists against the reference matcher at threshold boundaries...")
+    
+    feature_sets = [list(combo) for size in range(1, len(ALLOWED_FEATURES) + 1) for combo in combinations(ALLOWED_FEATURES, size)]
+    with patch.object(backend_app, "generate_ai_report", _fake_ai_report):
+        for rules in (backend_app._RULESET.rules, get_fallback_rules()):
+            ruleset = RuleSet.build(rules)
+            for area in _boundary_values(ruleset.area_thresholds, (-1, -0.5, 0, 0.5, 1)):
+                for seats in _boundary_values(ruleset.seat_thresholds, (-1, 0, 1)):
+                    for features in feature_sets:
+                        payload = {"area": area, "seats": seats, "features": features}
+                        expected = [rule["id"] for rule in rules if _reference_matches(rule.get("if", {}), payload)]
+                        checklist = evaluate_restaurant(payload, ruleset=ruleset)["checklist"]
+                        assert [rule["id"] for rule in checklist] == expected, payload
+    
+    print("✅ Threshold boundary tests passed")
+
 def run_all_tests():
     """Run all tests"""
     print("="*60)
@@ -208,6 +355,10 @@ def run_all_tests():
         test_large_restaurant_with_alcohol()
         test_high_capacity_restaurant()
         test_complex_features()
+        test_assess_validation()
+        test_assess_deferred_ai()
+        test_assess_etag()
+        test_checklist_matches_reference_at_thresholds()
         
         print("\n" + "="*60)
         print("✅ ALL TESTS PASSED!")
@@ -6,12 +6,20 @@ This script processes the regulatory document and creates a structured JSON file
 with licensing rules that can be loaded by the backend at runtime.
 """
 
+import functools
 import json
 import hashlib
 import logging
+import os
+import posixpath
 import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Iterable, Iterator
+
+from rules_io import dumps_rules, write_bytes_atomic
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -22,6 +30,75 @@ INPUT_DOCX = Path("data/raw/18-07-2022_4.2A.docx")
 INPUT_PDF = Path("data/raw/18-07-2022_4.2A.pdf")
 OUTPUT_PROCESSED = Path("data/processed/restaurant_rules.json")
 OUTPUT_BACKEND = Path("backend/rules/restaurant_rules.json")
+# Hashes of the inputs and this script from the last successful run - unchanged inputs skip the ETL
+ETL_CACHE_FILE = OUTPUT_PROCESSED.with_suffix(".meta.json")
+ETL_FORCE = os.getenv("ETL_FORCE", "").lower() in ("1", "true", "yes")
+
+# PDF pages are extracted in parallel worker processes, a fixed range of pages per task
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", os.cpu_count() or 1))
+PDF_PAGES_PER_TASK = 8
+
+# Regex patterns are compiled once at import - they run for every line of a multi-page document
+# Common Hebrew heading patterns in regulatory documents, fused into one anchored alternation
+# (lines ending with a colon are checked with str.endswith before the regex)
+_HEADING_RE = re.compile(
+    r'^(?:'
+    r'פרק\s+\d+'  # פרק 1, פרק 2, etc.
+    r'|נספח\s+[א-ת]'  # נספח א, נספח ב, etc.
+    r'|מבוא'  # מבוא
+    r'|תקנות?\s+'  # תקנות, תקנה
+    r'|דרישות?\s+'  # דרישות, דרישה
+    r'|משרד\s+'  # משרד הבריאות, משרד הפנים
+    r'|כבאות\s+'  # כבאות והצלה
+    r'|משטרת?\s+'  # משטרה, משטרת ישראל
+    r'|\d+\.\s*[א-ת]'  # 1. א, 2. ב (numbered sections)
+    r'|[א-ת]\.'  # א. ב. ג. (lettered sections)
+    r')'
+)
+_HEBREW_CHAR_RE = re.compile(r'[א-ת]')
+# str.translate table that deletes the Hebrew letters א-ת - counting them needs no regex or list
+_DELETE_HEBREW = dict.fromkeys(range(ord('א'), ord('ת') + 1))
+
+# Pattern matching for different rule types
+RULE_PATTERNS = {
+    "area_threshold": re.compile(r'(\d+)\s*מ[״"]*ר'),  # Area in square meters
+    "capacity_threshold": re.compile(r'(\d+)\s*מקומות?\s*ישיבה'),  # Seating capacity
+    "ministry_health": re.compile(r'משרד\s+הבריאות'),
+    "ministry_police": re.compile(r'משטרת?\s+ישראל'),
+    "fire_department": re.compile(r'כבאות\s+והצלה'),
+    "gas_requirements": re.compile(r'גז|גפ[״"]*מ'),
+    "delivery_service": re.compile(r'שליחת?\s+מזון|משלוח'),
+    "alcohol_service": re.compile(r'אלכוהול|משקאות?\s+חריפים?'),
+    "meat_handling": re.compile(r'בשר|דגים?|ווטרינר'),
+    "cooling_requirements": re.compile(r'קירור|טמפרטור'),
+    "hood_system": re.compile(r'מנדפים?|מערכת\s+כיבוי')
+}
+_AREA_RE = RULE_PATTERNS["area_threshold"]
+_CAPACITY_RE = RULE_PATTERNS["capacity_threshold"]
+_HEALTH_RE = RULE_PATTERNS["ministry_health"]
+_POLICE_RE = RULE_PATTERNS["ministry_police"]
+_FIRE_RE = RULE_PATTERNS["fire_department"]
+_GAS_RE = RULE_PATTERNS["gas_requirements"]
+_DELIVERY_RE = RULE_PATTERNS["delivery_service"]
+_MEAT_RE = RULE_PATTERNS["meat_handling"]
+_COOLING_RE = RULE_PATTERNS["cooling_requirements"]
+
+# Feature conditions detected in a rule's text, in the order they are listed in "features_any"
+FEATURE_PATTERNS = (
+    ("gas", re.compile(r'גז|גפ[״"]*מ')),
+    ("delivery", re.compile(r'שליחת?\s+מזון|משלוח')),
+    ("alcohol", re.compile(r'אלכוהול')),
+    ("meat_and_fish", re.compile(r'בשר|דגים?')),
+    ("hood", re.compile(r'מנדפים?')),
+)
+
+# WordprocessingML names used when streaming the document body (see iter_docx_paragraphs)
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_PACKAGE_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}Relationship"
+_W_BODY, _W_P, _W_R, _W_T, _W_BR = _W + "body", _W + "p", _W + "r", _W + "t", _W + "br"
+_W_HYPERLINK, _W_STYLE = _W + "hyperlink", _W + "style"
+# Run content rendered as text, the same way python-docx's Paragraph.text does
+_W_RUN_TEXT = {_W + "tab": "\t", _W + "ptab": "\t", _W + "cr": "\n", _W + "noBreakHyphen": "-"}
 
 def extract_sections_from_pdf(pdf_path: Path) -> List[Dict[str, Any]]:
     """
@@ -37,42 +114,11 @@ def extract_sections_from_pdf(pdf_path: Path) -> List[Dict[str, Any]]:
         import pdfplumber
         import PyPDF2
         
-        sections = []
-        current_section = {"heading": None, "paragraphs": []}
-        
-        def flush_section():
-            nonlocal current_section
-            if current_section["heading"] or current_section["paragraphs"]:
-                sections.append(current_section)
-            current_section = {"heading": None, "paragraphs": []}
-        
         # First try with pdfplumber (better text extraction)
         try:
-            with pdfplumber.open(pdf_path) as pdf:
-                full_text = ""
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        full_text += page_text + "\n"
-                
-                # Process text line by line
-                lines = full_text.split('\n')
-                for line in lines:
-                    line = line.strip()
-                    if not line:
-                        continue
-                    
-                    # Detect headings - Hebrew text patterns for regulatory documents
-                    if is_heading_line(line):
-                        flush_section()
-                        current_section["heading"] = line
-                        logger.debug(f"Found PDF heading: {line}")
-                    else:
-                        current_section["paragraphs"].append(line)
-                
-                flush_section()
-                logger.info(f"Extracted {len(sections)} sections from PDF using pdfplumber")
-                return sections
+            sections = sections_from_lines(iter_page_lines(extract_pdf_page_texts(pdf_path)), "PDF")
+            logger.info(f"Extracted {len(sections)} sections from PDF using pdfplumber")
+            return sections
                 
         except Exception as e:
             logger.warning(f"pdfplumber failed: {e}, trying PyPDF2")
@@ -80,27 +126,11 @@ def extract_sections_from_pdf(pdf_path: Path) -> List[Dict[str, Any]]:
             # Fallback to PyPDF2
             with open(pdf_path, 'rb') as file:
                 pdf_reader = PyPDF2.PdfReader(file)
-                full_text = ""
-                for page in pdf_reader.pages:
-                    full_text += page.extract_text() + "\n"
-                
-                # Process similar to pdfplumber
-                lines = full_text.split('\n')
-                for line in lines:
-                    line = line.strip()
-                    if not line:
-                        continue
-                    
-                    if is_heading_line(line):
-                        flush_section()
-                        current_section["heading"] = line
-                        logger.debug(f"Found PDF heading (PyPDF2): {line}")
-                    else:
-                        current_section["paragraphs"].append(line)
-                
-                flush_section()
-                logger.info(f"Extracted {len(sections)} sections from PDF using PyPDF2")
-                return sections
+                sections = sections_from_lines(
+                    iter_page_lines(page.extract_text() for page in pdf_reader.pages), "PDF (PyPDF2)"
+                )
+            logger.info(f"Extracted {len(sections)} sections from PDF using PyPDF2")
+            return sections
         
     except ImportError as e:
         logger.error(f"PDF libraries not installed. Please install: pip install pdfplumber PyPDF2")
@@ -110,6 +140,73 @@ def extract_sections_from_pdf(pdf_path: Path) -> List[Dict[str, Any]]:
         logger.error(f"Error reading PDF document: {e}")
         return []
 
+def _extract_page_range(task: Tuple[str, int, int]) -> List[Optional[str]]:
+    """Text of pages [start, stop) - runs in a worker process, which opens the PDF itself"""
+    import pdfplumber
+    
+    pdf_path, start, stop = task
+    with pdfplumber.open(pdf_path) as pdf:
+        return [pdf.pages[index].extract_text() for index in range(start, stop)]
+
+def extract_pdf_page_texts(pdf_path: Path) -> Iterator[Optional[str]]:
+    """
+    Yield the pdfplumber text of every page, in page order
+    
+    Page ranges are extracted in parallel by up to PDF_WORKERS processes (pdfplumber's
+    layout analysis is pure Python, so threads would not help); with one worker it runs in-process.
+    """
+    import pdfplumber
+    
+    with pdfplumber.open(pdf_path) as pdf:
+        page_count = len(pdf.pages)
+        workers = min(PDF_WORKERS, -(-page_count // PDF_PAGES_PER_TASK))
+        if workers <= 1:
+            for page in pdf.pages:
+                yield page.extract_text()
+            return
+    
+    tasks = [(str(pdf_path), start, min(start + PDF_PAGES_PER_TASK, page_count))
+             for start in range(0, page_count, PDF_PAGES_PER_TASK)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from chain.from_iterable(executor.map(_extract_page_range, tasks))
+
+def iter_page_lines(page_texts: Iterable[Optional[str]]) -> Iterator[str]:
+    """
+    Yield the stripped, non-empty lines of each page in turn
+    
+    Pages are split one at a time, so the whole document is never joined into a single string.
+    """
+    for page_text in page_texts:
+        if not page_text:
+            continue
+        for line in page_text.split('\n'):
+            line = line.strip()
+            if line:
+                yield line
+
+def sections_from_lines(lines: Iterable[str], source: str) -> List[Dict[str, Any]]:
+    """Group text lines into sections - a heading line starts a new section, other lines are its paragraphs"""
+    sections = []
+    current_section = {"heading": None, "paragraphs": [], "source": "pdf"}
+    
+    for line in lines:
+        # Detect headings - Hebrew text patterns for regulatory documents
+        if is_heading_line(line):
+            if current_section["heading"] or current_section["paragraphs"]:
+                sections.append(current_section)
+            current_section = {"heading": line, "paragraphs": [], "source": "pdf"}
+            logger.debug("Found %s heading: %s", source, line)
+        else:
+            current_section["paragraphs"].append(line)
+    
+    if current_section["heading"] or current_section["paragraphs"]:
+        sections.append(current_section)
+    return sections
+
+def count_hebrew_chars(text: str) -> int:
+    """Number of Hebrew letters (א-ת) in text"""
+    return len(text) - len(text.translate(_DELETE_HEBREW))
+
 def is_heading_line(line: str) -> bool:
     """
     Detect if a line is likely a heading based on Hebrew regulatory document patterns
@@ -117,42 +214,107 @@ def is_heading_line(line: str) -> bool:
     if len(line) < 3:
         return False
     
-    # Common Hebrew heading patterns in regulatory documents
-    heading_patterns = [
-        r'^פרק\s+\d+',  # פרק 1, פרק 2, etc.
-        r'^נספח\s+[א-ת]',  # נספח א, נספח ב, etc.
-        r'^מבוא',  # מבוא
-        r'^תקנות?\s+',  # תקנות, תקנה
-        r'^דרישות?\s+',  # דרישות, דרישה
-        r'^משרד\s+',  # משרד הבריאות, משרד הפנים
-        r'^כבאות\s+',  # כבאות והצלה
-        r'^משטרת?\s+',  # משטרה, משטרת ישראל
-        r'^\d+\.\s*[א-ת]',  # 1. א, 2. ב (numbered sections)
-        r'^[א-ת]\.\s*',  # א. ב. ג. (lettered sections)
-        r'.*:$',  # Lines ending with colon (common in Hebrew headings)
-    ]
-    
-    for pattern in heading_patterns:
-        if re.search(pattern, line):
-            return True
+    # Lines ending with colon (common in Hebrew headings), then the fused heading patterns -
+    # every one of them starts with a Hebrew letter or a digit, so other lines skip the regex
+    first = line[0]
+    if line.endswith(':') or (('א' <= first <= 'ת' or first.isdecimal()) and _HEADING_RE.match(line)):
+        return True
     
     # Check for all-caps Hebrew text (often headings)
-    hebrew_chars = re.findall(r'[א-ת]', line)
-    if len(hebrew_chars) > 3 and line.isupper():
+    hebrew_count = count_hebrew_chars(line)
+    if hebrew_count > 3 and line.isupper():
         return True
     
     # Check for short lines that might be headings (less than 80 chars, more than 10)
     if 10 < len(line) < 80 and not line.endswith('.') and not line.endswith(','):
         # Count Hebrew characters
-        hebrew_ratio = len(hebrew_chars) / len(line) if line else 0
+        hebrew_ratio = hebrew_count / len(line) if line else 0
         if hebrew_ratio > 0.5:  # Mostly Hebrew
             return True
     
     return False
 
+def _docx_rel_target(zf: zipfile.ZipFile, part: str, rel_type: str) -> Optional[str]:
+    """Zip path of the part that `part` links to with a relationship of type .../rel_type"""
+    from lxml import etree
+    
+    rels_path = posixpath.join(posixpath.dirname(part), "_rels", posixpath.basename(part) + ".rels")
+    for rel in etree.parse(zf.open(rels_path)).getroot().iter(_PACKAGE_REL):
+        if rel.get("Type", "").endswith("/" + rel_type):
+            target = rel.get("Target")
+            if target.startswith("/"):
+                return target[1:]
+            return posixpath.normpath(posixpath.join(posixpath.dirname(part), target))
+    return None
+
+def _docx_paragraph_styles(zf: zipfile.ZipFile, styles_part: Optional[str]) -> Tuple[Dict[str, str], str]:
+    """Lower-cased paragraph style names by style id, and the name of the default paragraph style"""
+    from lxml import etree
+    
+    names, default = {}, ""
+    if styles_part is None:
+        return names, default
+    for style in etree.parse(zf.open(styles_part)).getroot().iterchildren(_W_STYLE):
+        if style.get(_W + "type") != "paragraph":
+            continue
+        name_el = style.find(_W + "name")
+        name = (name_el.get(_W + "val") or "").lower() if name_el is not None else ""
+        names.setdefault(style.get(_W + "styleId"), name)
+        if style.get(_W + "default") in ("1", "true", "on"):
+            default = name  # The last default in document order wins
+    return names, default
+
+def _docx_paragraph_text(paragraph) -> str:
+    """Text of a <w:p> element - runs and hyperlink runs, like python-docx's Paragraph.text"""
+    parts = []
+    for child in paragraph:
+        if child.tag == _W_R:
+            runs = (child,)
+        elif child.tag == _W_HYPERLINK:
+            runs = child.iterchildren(_W_R)
+        else:
+            continue
+        for run in runs:
+            for item in run:
+                if item.tag == _W_T:
+                    parts.append(item.text or "")
+                elif item.tag == _W_BR:
+                    # Page and column breaks carry no text
+                    if item.get(_W + "type", "textWrapping") == "textWrapping":
+                        parts.append("\n")
+                else:
+                    parts.append(_W_RUN_TEXT.get(item.tag, ""))
+    return "".join(parts)
+
+def iter_docx_paragraphs(docx_path: Path) -> Iterator[Tuple[str, str]]:
+    """
+    Stream (lower-cased style name, text) for each top-level paragraph of a Word document
+    
+    The document XML is read with lxml iterparse and every paragraph is dropped once handled,
+    so no python-docx object tree is built. Like Document.paragraphs, only direct children
+    of the body are yielded - paragraphs inside tables are skipped.
+    """
+    from lxml import etree
+    
+    with zipfile.ZipFile(docx_path) as zf:
+        document_part = _docx_rel_target(zf, "", "officeDocument")
+        styles, default_style = _docx_paragraph_styles(zf, _docx_rel_target(zf, document_part, "styles"))
+        
+        with zf.open(document_part) as xml:
+            for _, paragraph in etree.iterparse(xml, events=("end",), tag=_W_P):
+                parent = paragraph.getparent()
+                if parent is not None and parent.tag == _W_BODY:
+                    p_style = paragraph.find(f"{_W}pPr/{_W}pStyle")
+                    style_id = p_style.get(_W + "val") if p_style is not None else None
+                    yield styles.get(style_id, default_style), _docx_paragraph_text(paragraph)
+                
+                # Release the paragraph's runs once handled - only an empty <w:p> stays in the tree.
+                # Detaching the elements as well (del parent[0]) made the whole read ten times slower.
+                paragraph.clear()
+
 def extract_sections_from_docx(docx_path: Path) -> List[Dict[str, Any]]:
     """
-    Extract sections from Word document using python-docx
+    Extract sections from Word document, streaming its XML with lxml
     
     Args:
         docx_path: Path to the Word document
@@ -161,30 +323,25 @@ def extract_sections_from_docx(docx_path: Path) -> List[Dict[str, Any]]:
         List of sections with headings and paragraphs
     """
     try:
-        from docx import Document
-        
-        doc = Document(docx_path)
         sections = []
-        current_section = {"heading": None, "paragraphs": []}
+        current_section = {"heading": None, "paragraphs": [], "source": "docx"}
         
         def flush_section():
             nonlocal current_section
             if current_section["heading"] or current_section["paragraphs"]:
                 sections.append(current_section)
-            current_section = {"heading": None, "paragraphs": []}
+            current_section = {"heading": None, "paragraphs": [], "source": "docx"}
         
-        for paragraph in doc.paragraphs:
-            text = (paragraph.text or "").strip()
+        for style_name, text in iter_docx_paragraphs(docx_path):
+            text = text.strip()
             if not text:
                 continue
-                
-            style_name = (paragraph.style.name or "").lower()
             
             # Check if this is a heading
             if "heading" in style_name:
                 flush_section()
                 current_section["heading"] = text
-                logger.debug(f"Found heading: {text}")
+                logger.debug("Found heading: %s", text)
             else:
                 current_section["paragraphs"].append(text)
         
@@ -193,7 +350,7 @@ def extract_sections_from_docx(docx_path: Path) -> List[Dict[str, Any]]:
         return sections
         
     except ImportError:
-        logger.error("python-docx not installed. Please install: pip install python-docx")
+        logger.error("lxml not installed. Please install: pip install lxml")
         return []
     except Exception as e:
         logger.error(f"Error reading document: {e}")
@@ -217,75 +374,56 @@ def extract_rules_from_document(sections: List[Dict[str, Any]]) -> List[Dict[str
     extracted_rules = []
     rule_counter = 1
     
-    # Pattern matching for different rule types
-    rule_patterns = {
-        "area_threshold": r'(\d+)\s*מ[״"]*ר',  # Area in square meters
-        "capacity_threshold": r'(\d+)\s*מקומות?\s*ישיבה',  # Seating capacity
-        "ministry_health": r'משרד\s+הבריאות',
-        "ministry_police": r'משטרת?\s+ישראל',
-        "fire_department": r'כבאות\s+והצלה',
-        "gas_requirements": r'גז|גפ[״"]*מ',
-        "delivery_service": r'שליחת?\s+מזון|משלוח',
-        "alcohol_service": r'אלכוהול|משקאות?\s+חריפים?',
-        "meat_handling": r'בשר|דגים?|ווטרינר',
-        "cooling_requirements": r'קירור|טמפרטור',
-        "hood_system": r'מנדפים?|מערכת\s+כיבוי'
-    }
-    
     for section in sections:
         if not section.get("heading"):
             continue
             
         heading = section["heading"]
-        content = " ".join(section.get("paragraphs", []))
-        full_text = f"{heading} {content}"
-        
-        # Extract area and capacity thresholds
-        area_matches = re.findall(rule_patterns["area_threshold"], full_text)
-        capacity_matches = re.findall(rule_patterns["capacity_threshold"], full_text)
+        # One string for heading and paragraphs - the content part is sliced out only for kept rules
+        full_text = " ".join([heading, *section.get("paragraphs", [])])
         
         # Determine rule category based on content
-        category = determine_rule_category(full_text, rule_patterns)
+        category = determine_rule_category(full_text)
         
         # Create rule based on detected patterns
         if category:
             rule = create_rule_from_content(
                 rule_id=f"extracted-{rule_counter}",
                 heading=heading,
-                content=content,
                 category=category,
-                area_thresholds=area_matches,
-                capacity_thresholds=capacity_matches,
-                full_text=full_text
+                area_thresholds=_AREA_RE.findall(full_text),
+                capacity_thresholds=_CAPACITY_RE.findall(full_text),
+                full_text=full_text,
+                source=section.get("source", "pdf")
             )
             
             if rule:
                 extracted_rules.append(rule)
                 rule_counter += 1
-                logger.debug(f"Extracted rule: {rule['title']}")
+                logger.debug("Extracted rule: %s", rule['title'])
     
     logger.info(f"Extracted {len(extracted_rules)} rules from document content")
     return extracted_rules
 
-def determine_rule_category(text: str, patterns: Dict[str, str]) -> Optional[str]:
+def determine_rule_category(text: str) -> Optional[str]:
     """Determine the regulatory category based on text content"""
-    if re.search(patterns["ministry_health"], text):
-        if re.search(patterns["delivery_service"], text):
+    if _HEALTH_RE.search(text):
+        if _DELIVERY_RE.search(text):
             return "משרד הבריאות — שליחת מזון"
-        elif re.search(patterns["meat_handling"], text):
+        elif _MEAT_RE.search(text):
             return "משרד הבריאות — בשר ודגים"
-        elif re.search(patterns["cooling_requirements"], text):
+        elif _COOLING_RE.search(text):
             return "משרד הבריאות — קירור"
         else:
             return "משרד הבריאות"
     
-    elif re.search(patterns["ministry_police"], text):
+    elif _POLICE_RE.search(text):
         return "משטרת ישראל"
     
-    elif re.search(patterns["fire_department"], text):
+    elif _FIRE_RE.search(text):
         return "כבאות והצלה"
     
-    elif re.search(patterns["gas_requirements"], text):
+    elif _GAS_RE.search(text):
         return "גז (גפ\"מ)"
     
     return None
@@ -295,39 +433,38 @@ def fix_hebrew_text_direction(text: str) -> str:
     Fix reversed Hebrew text that sometimes occurs in PDF extraction
     """
     # Check if text contains Hebrew characters
-    if not re.search(r'[א-ת]', text):
+    if not _HEBREW_CHAR_RE.search(text):
         return text
     
     # If text seems to be reversed (common PDF issue), try to fix it
     # This is a simple heuristic - in practice you might need more sophisticated logic
-    words = text.split()
-    hebrew_words = []
-    
-    for word in words:
-        if re.search(r'[א-ת]', word):
-            # Reverse Hebrew words that appear to be backwards
-            if len(word) > 3 and not word.endswith('.') and not word.startswith('('):
-                hebrew_words.append(word[::-1])
-            else:
-                hebrew_words.append(word)
-        else:
-            hebrew_words.append(word)
-    
-    return ' '.join(hebrew_words)
+    # Reverse Hebrew words that appear to be backwards. The cheap checks run first and ASCII
+    # words (numbers, Latin) never reach the regex; split() never yields an empty word.
+    search = _HEBREW_CHAR_RE.search
+    return ' '.join([
+        word[::-1]
+        if len(word) > 3 and not word.isascii() and word[-1] != '.' and word[0] != '(' and search(word)
+        else word
+        for word in text.split()
+    ])
 
-def create_rule_from_content(rule_id: str, heading: str, content: str, category: str, 
+def create_rule_from_content(rule_id: str, heading: str, category: str,
                            area_thresholds: List[str], capacity_thresholds: List[str],
-                           full_text: str) -> Optional[Dict[str, Any]]:
-    """Create a structured rule from document content"""
+                           full_text: str, source: str = "pdf") -> Optional[Dict[str, Any]]:
+    """Create a structured rule from document content (full_text is the heading, a space, then the paragraphs)"""
     
-    # Fix Hebrew text direction issues
-    heading_fixed = fix_hebrew_text_direction(heading)
-    content_fixed = fix_hebrew_text_direction(content)
+    # Fix Hebrew text direction issues - only PDF text comes out reversed, Word text is already in order.
+    # Word text still gets the same whitespace collapsing (tabs, line breaks, double spaces)
+    fix_direction = source == "pdf"
+    heading_fixed = fix_hebrew_text_direction(heading) if fix_direction else ' '.join(heading.split())
     
     # Skip rules with garbled or very short text
     if len(heading_fixed.strip()) < 5 or heading_fixed.count('.') > len(heading_fixed) / 3:
         return None
     
+    content = full_text[len(heading) + 1:]
+    content_fixed = fix_hebrew_text_direction(content) if fix_direction else ' '.join(content.split())
+    
     # Build conditions based on detected thresholds
     conditions = {}
     
@@ -350,17 +487,7 @@ def create_rule_from_content(rule_id: str, heading: str, content: str, category:
             conditions["seats_min"] = 201
     
     # Add feature conditions based on content
-    features = []
-    if re.search(r'גז|גפ[״"]*מ', full_text):
-        features.append("gas")
-    if re.search(r'שליחת?\s+מזון|משלוח', full_text):
-        features.append("delivery")
-    if re.search(r'אלכוהול', full_text):
-        features.append("alcohol")
-    if re.search(r'בשר|דגים?', full_text):
-        features.append("meat_and_fish")
-    if re.search(r'מנדפים?', full_text):
-        features.append("hood")
+    features = [feature for feature, pattern in FEATURE_PATTERNS if pattern.search(full_text)]
     
     if features:
         conditions["features_any"] = features
@@ -535,14 +662,66 @@ def create_curated_rules(document_analysis: Dict[str, Any] = None) -> List[Dict[
     logger.info(f"Created {len(rules)} curated rules")
     return rules
 
-def calculate_file_hash(file_path: Path) -> str:
-    """Calculate SHA256 hash of a file"""
+def stat_or_none(path: Path) -> Optional[os.stat_result]:
+    """os.stat of a path, or None when it does not exist - one syscall answers both questions"""
+    try:
+        return path.stat()
+    except FileNotFoundError:
+        return None
+
+def calculate_file_hash(file_path: Path, stat: Optional[os.stat_result] = None) -> str:
+    """Calculate SHA256 hash of a file (computed once per file version - keyed by path, mtime and size)"""
     try:
-        return hashlib.sha256(file_path.read_bytes()).hexdigest()
+        stat = stat or file_path.stat()
+        return _file_sha256(str(file_path), stat.st_mtime_ns, stat.st_size)
     except Exception as e:
         logger.error(f"Error calculating hash for {file_path}: {e}")
         return "unknown"
 
+@functools.lru_cache(maxsize=None)
+def _file_sha256(path: str, mtime_ns: int, size: int) -> str:
+    """SHA256 of a file, streamed so the file is never held in memory whole"""
+    with open(path, 'rb', buffering=0) as f:
+        if hasattr(hashlib, 'file_digest'):  # Python 3.11+
+            return hashlib.file_digest(f, 'sha256').hexdigest()
+        digest = hashlib.sha256()
+        while chunk := f.read(1 << 20):  # 1 MiB reads straight from the unbuffered file
+            digest.update(chunk)
+        return digest.hexdigest()
+
+def etl_cache_key(pdf_stat: Optional[os.stat_result], docx_stat: Optional[os.stat_result]) -> Dict[str, str]:
+    """Hashes of everything the generated rules depend on - both source documents, this script and its serializer"""
+    return {
+        "pdf_sha256": calculate_file_hash(INPUT_PDF, pdf_stat) if pdf_stat else "file_not_found",
+        "docx_sha256": calculate_file_hash(INPUT_DOCX, docx_stat) if docx_stat else "file_not_found",
+        "script_sha256": calculate_file_hash(Path(__file__)),
+        "rules_io_sha256": calculate_file_hash(Path(__file__).with_name("rules_io.py")),
+    }
+
+def output_sha256(path: Path) -> str:
+    """SHA256 of an output file as it is now (not cached - the outputs are rewritten and can be edited by hand)"""
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+def etl_cache_hit(cache_key: Dict[str, str]) -> bool:
+    """True when the last run had the same inputs and both of its outputs still hold the bytes it wrote"""
+    try:
+        meta = json.loads(ETL_CACHE_FILE.read_bytes())
+        return (
+            meta.get("key") == cache_key
+            and output_sha256(OUTPUT_PROCESSED) == meta.get("sha256")
+            and output_sha256(OUTPUT_BACKEND) == meta.get("sha256")
+        )
+    except (OSError, ValueError):
+        return False
+
+def write_etl_cache(cache_key: Dict[str, str], data: bytes) -> None:
+    """Record the inputs and the hash of the written rules (written to a temp file and renamed into place)"""
+    try:
+        meta = {"key": cache_key, "sha256": hashlib.sha256(data).hexdigest()}
+        write_bytes_atomic(ETL_CACHE_FILE, json.dumps(meta, indent=2).encode('utf-8'))
+    except Exception as e:
+        logger.warning(f"Could not write ETL cache file {ETL_CACHE_FILE}: {e}")
+
 def remove_duplicate_rules(rules: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """
     Remove duplicate rules based on similar titles and categories
@@ -558,21 +737,21 @@ def remove_duplicate_rules(rules: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     
     for rule in rules:
         # Create a key based on category and normalized title
-        title_normalized = re.sub(r'\s+', ' ', rule['title'].strip().lower())
+        title_normalized = ' '.join(rule['title'].lower().split())
         category_normalized = rule['category'].strip().lower()
-        key = f"{category_normalized}::{title_normalized}"
+        key = (category_normalized, title_normalized)
         
         if key not in seen_combinations:
             seen_combinations.add(key)
             unique_rules.append(rule)
         else:
-            logger.debug(f"Skipping duplicate rule: {rule['title']}")
+            logger.debug("Skipping duplicate rule: %s", rule['title'])
     
     logger.info(f"Removed {len(rules) - len(unique_rules)} duplicate rules")
     return unique_rules
 
-def write_rules_to_files(rules: List[Dict[str, Any]]) -> bool:
-    """Write rules to both processed and backend locations"""
+def write_rules_to_files(rules: List[Dict[str, Any]], data: bytes) -> bool:
+    """Write the serialized rules to both processed and backend locations (same bytes to both)"""
     success = True
     
     for output_path in [OUTPUT_PROCESSED, OUTPUT_BACKEND]:
@@ -580,9 +759,8 @@ def write_rules_to_files(rules: List[Dict[str, Any]]) -> bool:
             # Ensure output directory exists
             output_path.parent.mkdir(parents=True, exist_ok=True)
             
-            # Write rules to JSON file
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(rules, f, ensure_ascii=False, indent=2)
+            # Write rules to JSON file (atomically - an interrupted run keeps the previous file)
+            write_bytes_atomic(output_path, data)
             logger.info(f"Successfully wrote {len(rules)} rules to {output_path}")
             
         except Exception as e:
@@ -621,7 +799,8 @@ def analyze_document_structure(sections: List[Dict[str, Any]]) -> Dict[str, Any]
             heading = section["heading"]
             
             # Check if this looks like a chapter heading
-            if any(word in heading for word in ["פרק", "נספח", "מבוא"]):
+            # Chained substring checks - no generator or list per heading, same matches as before
+            if "פרק" in heading or "נספח" in heading or "מבוא" in heading:
                 analysis["chapter_headings"].append(heading)
             
             # Count key terms in headings and paragraphs
@@ -638,12 +817,23 @@ def main():
     logger.info("Starting ETL process: PDF/Word documents → JSON rules")
     logger.info("="*60)
     
+    # Each input is stat'ed once - existence, hashing and the metadata below all reuse the result
+    pdf_stat = stat_or_none(INPUT_PDF)
+    docx_stat = stat_or_none(INPUT_DOCX)
+    
+    # Skip the whole run when the documents and this script are unchanged since the last one
+    cache_key = etl_cache_key(pdf_stat, docx_stat)
+    if not ETL_FORCE and etl_cache_hit(cache_key):
+        logger.info(f"Documents and script unchanged since the last run - {OUTPUT_BACKEND} is up to date")
+        logger.info(f"(delete {ETL_CACHE_FILE} or set ETL_FORCE=1 to rebuild)")
+        return True
+    
     # Extract sections from available documents
     all_sections = []
     document_sources = []
     
     # Try to process PDF first (usually more reliable)
-    if INPUT_PDF.exists():
+    if pdf_stat:
         logger.info(f"Processing PDF document: {INPUT_PDF}")
         pdf_sections = extract_sections_from_pdf(INPUT_PDF)
         if pdf_sections:
@@ -656,7 +846,7 @@ def main():
         logger.warning(f"PDF document not found: {INPUT_PDF}")
     
     # Try to process Word document
-    if INPUT_DOCX.exists():
+    if docx_stat:
         logger.info(f"Processing Word document: {INPUT_DOCX}")
         docx_sections = extract_sections_from_docx(INPUT_DOCX)
         if docx_sections:
@@ -708,18 +898,22 @@ def main():
     rules = unique_rules
     
     # Write rules to both locations
-    if not write_rules_to_files(rules):
+    data = dumps_rules(rules)
+    if not write_rules_to_files(rules, data):
         return False
+    write_etl_cache(cache_key, data)
+    processed_stat = stat_or_none(OUTPUT_PROCESSED)
+    backend_stat = stat_or_none(OUTPUT_BACKEND)
     
     # Generate and display metadata
     metadata = {
         "sources_processed": document_sources,
         "docx_file": str(INPUT_DOCX),
-        "docx_exists": INPUT_DOCX.exists(),
-        "docx_sha256": calculate_file_hash(INPUT_DOCX) if INPUT_DOCX.exists() else "file_not_found",
+        "docx_exists": docx_stat is not None,
+        "docx_sha256": cache_key["docx_sha256"],
         "pdf_file": str(INPUT_PDF),
-        "pdf_exists": INPUT_PDF.exists(),
-        "pdf_sha256": calculate_file_hash(INPUT_PDF) if INPUT_PDF.exists() else "file_not_found",
+        "pdf_exists": pdf_stat is not None,
+        "pdf_sha256": cache_key["pdf_sha256"],
         "total_sections": len(all_sections),
         "extracted_rules": len(extracted_rules),
         "curated_rules": len(curated_rules),
@@ -728,8 +922,8 @@ def main():
         "chapter_headings": len(document_analysis.get("chapter_headings", [])),
         "output_processed": str(OUTPUT_PROCESSED),
         "output_backend": str(OUTPUT_BACKEND),
-        "processed_size_bytes": OUTPUT_PROCESSED.stat().st_size if OUTPUT_PROCESSED.exists() else 0,
-        "backend_size_bytes": OUTPUT_BACKEND.stat().st_size if OUTPUT_BACKEND.exists() else 0
+        "processed_size_bytes": processed_stat.st_size if processed_stat else 0,
+        "backend_size_bytes": backend_stat.st_size if backend_stat else 0
     }
     
     print("\n" + "="*60)
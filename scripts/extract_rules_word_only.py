@@ -5,13 +5,14 @@ ETL Script: Extract restaurant licensing rules from Word document ONLY
 This script processes ONLY the Word document to avoid Hebrew text reversal issues from PDF
 """
 
-import json
 import hashlib
 import logging
 import re
 from pathlib import Path
 from typing import List, Dict, Any, Optional, Tuple
 
+from rules_io import dumps_rules, write_bytes_atomic
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -20,6 +21,30 @@ logger = logging.getLogger(__name__)
 INPUT_DOCX = Path("data/raw/18-07-2022_4.2A.docx")
 OUTPUT_BACKEND = Path("backend/rules/restaurant_rules.json")
 
+# Regex patterns are compiled once at import - they run for every paragraph of the document
+# Table of contents, page numbers, headers
+_SKIP_PATTERNS = tuple(re.compile(pattern) for pattern in (
+    r"^תוכן עניינים",
+    r"^עמוד \d+",
+    r"^\d+$",
+    r"^\.{3,}",
+    r"^מפרט אחיד לפריט",
+    r"^הערה:",
+    r"^פרק \d+ -",
+))
+_AREA_RE = re.compile(r'(\d+)\s*מ[״"]*ר')
+_CAPACITY_RE = re.compile(r'(\d+)\s*מקומות?\s+ישיבה')
+_EMPLOYEES_RE = re.compile(r'(\d+)\s*עובדים?')
+
+# Feature conditions detected in a paragraph, in the order they are listed in "features_any"
+FEATURE_PATTERNS = (
+    ("gas", re.compile(r'גז|גפ[״"]*מ')),
+    ("delivery", re.compile(r'משלוח|שליחת?\s+מזון')),
+    ("alcohol", re.compile(r'אלכוהול|משקאות?\s+משכרים?')),
+    ("meat_and_fish", re.compile(r'בשר|עופות?|דגים?')),
+    ("hood", re.compile(r'מנדפים?|אוורור')),
+)
+
 def extract_sections_from_docx(docx_path: Path) -> List[Dict[str, Any]]:
     """
     Extract sections from Word document using python-docx
@@ -30,6 +55,8 @@ def extract_sections_from_docx(docx_path: Path) -> List[Dict[str, Any]]:
         doc = Document(docx_path)
         sections = []
         current_section = {"heading": None, "paragraphs": []}
+        # Lower-cased style name per w:pStyle id - paragraph.style looks the style up in styles.xml on every access
+        style_names = {}
         
         def flush_section():
             nonlocal current_section
@@ -42,13 +69,22 @@ def extract_sections_from_docx(docx_path: Path) -> List[Dict[str, Any]]:
             if not text:
                 continue
                 
-            style_name = (paragraph.style.name or "").lower()
+            try:
+                # w:pStyle id straight from the paragraph XML - a python-docx internal (pinned in requirements.txt)
+                style_id = paragraph._p.style
+            except AttributeError:
+                # the internal moved in another python-docx version - public lookup, uncached
+                style_name = (paragraph.style.name or "").lower()
+            else:
+                style_name = style_names.get(style_id)
+                if style_name is None:
+                    style_name = style_names[style_id] = (paragraph.style.name or "").lower()
             
             # Check if this is a heading
             if "heading" in style_name:
                 flush_section()
                 current_section["heading"] = text
-                logger.debug(f"Found heading: {text}")
+                logger.debug("Found heading: %s", text)
             else:
                 current_section["paragraphs"].append(text)
         
@@ -88,18 +124,9 @@ def is_meaningful_regulatory_content(text: str) -> bool:
         return False
     
     # Skip table of contents, page numbers, headers
-    skip_patterns = [
-        r"^תוכן עניינים",
-        r"^עמוד \d+",
-        r"^\d+$",
-        r"^\.{3,}",
-        r"^מפרט אחיד לפריט",
-        r"^הערה:",
-        r"^פרק \d+ -",
-    ]
-    
-    for pattern in skip_patterns:
-        if re.match(pattern, text.strip()):
+    stripped = text.strip()
+    for pattern in _SKIP_PATTERNS:
+        if pattern.match(stripped):
             return False
     
     # Look for regulatory indicators
@@ -117,7 +144,7 @@ def extract_conditions_from_text(text: str) -> Dict[str, Any]:
     conditions = {}
     
     # Look for area thresholds (square meters)
-    area_matches = re.findall(r'(\d+)\s*מ[״"]*ר', text)
+    area_matches = _AREA_RE.findall(text)
     if area_matches:
         areas = [int(a) for a in area_matches]
         if any(area <= 150 for area in areas):
@@ -126,7 +153,7 @@ def extract_conditions_from_text(text: str) -> Dict[str, Any]:
             conditions["area_min"] = 151
     
     # Look for capacity thresholds
-    capacity_matches = re.findall(r'(\d+)\s*מקומות?\s+ישיבה', text)
+    capacity_matches = _CAPACITY_RE.findall(text)
     if capacity_matches:
         capacities = [int(c) for c in capacity_matches]
         if any(cap <= 50 for cap in capacities):
@@ -135,23 +162,13 @@ def extract_conditions_from_text(text: str) -> Dict[str, Any]:
             conditions["seats_min"] = 51
     
     # Look for employee thresholds
-    employee_matches = re.findall(r'(\d+)\s*עובדים?', text)
+    employee_matches = _EMPLOYEES_RE.findall(text)
     if employee_matches:
         employees = [int(e) for e in employee_matches]
         conditions["employees_min"] = min(employees)
     
     # Look for feature requirements
-    features = []
-    if re.search(r'גז|גפ[״"]*מ', text):
-        features.append("gas")
-    if re.search(r'משלוח|שליחת?\s+מזון', text):
-        features.append("delivery")
-    if re.search(r'אלכוהול|משקאות?\s+משכרים?', text):
-        features.append("alcohol")
-    if re.search(r'בשר|עופות?|דגים?', text):
-        features.append("meat_and_fish")
-    if re.search(r'מנדפים?|אוורור', text):
-        features.append("hood")
+    features = [feature for feature, pattern in FEATURE_PATTERNS if pattern.search(text)]
     
     if features:
         conditions["features_any"] = features
@@ -215,7 +232,7 @@ def extract_rules_from_sections(sections: List[Dict[str, Any]]) -> List[Dict[str
         all_content = (heading or "") + " " + " ".join(paragraphs)
         chapter = detect_chapter_from_content(all_content)
         
-        logger.debug(f"Processing section '{heading}' as chapter '{chapter}'")
+        logger.debug("Processing section '%s' as chapter '%s'", heading, chapter)
         
         # Process each paragraph as a potential rule
         for paragraph in paragraphs:
@@ -235,9 +252,8 @@ def save_rules_to_json(rules: List[Dict[str, Any]], output_path: Path) -> bool:
         # Ensure output directory exists
         output_path.parent.mkdir(parents=True, exist_ok=True)
         
-        # Save rules
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(rules, f, ensure_ascii=False, indent=2)
+        # Save rules (atomically - an interrupted run keeps the previous file)
+        write_bytes_atomic(output_path, dumps_rules(rules))
         
         logger.info(f"Saved {len(rules)} rules to {output_path}")
         return True
@@ -249,11 +265,13 @@ def save_rules_to_json(rules: List[Dict[str, Any]], output_path: Path) -> bool:
 def calculate_file_hash(file_path: Path) -> str:
     """Calculate MD5 hash of file"""
     try:
-        hash_md5 = hashlib.md5()
-        with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hash_md5.update(chunk)
-        return hash_md5.hexdigest()
+        with open(file_path, "rb", buffering=0) as f:
+            if hasattr(hashlib, "file_digest"):  # Python 3.11+
+                return hashlib.file_digest(f, "md5").hexdigest()
+            digest = hashlib.md5()
+            while chunk := f.read(1 << 20):  # 1 MiB reads straight from the unbuffered file
+                digest.update(chunk)
+            return digest.hexdigest()
     except Exception as e:
         logger.warning(f"Error calculating hash for {file_path}: {e}")
         return "unknown"
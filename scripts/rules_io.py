@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Output helpers shared by the ETL scripts (extract_rules.py, extract_rules_word_only.py)
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import List, Dict, Any
+
+try:
+    import orjson
+
+    def dumps_rules(rules: List[Dict[str, Any]]) -> bytes:
+        """Rules as indented UTF-8 JSON (orjson - same bytes as json.dumps(ensure_ascii=False, indent=2))"""
+        return orjson.dumps(rules, option=orjson.OPT_INDENT_2)
+except ImportError:
+    def dumps_rules(rules: List[Dict[str, Any]]) -> bytes:
+        """Rules as indented UTF-8 JSON"""
+        return json.dumps(rules, ensure_ascii=False, indent=2).encode('utf-8')
+
+def write_bytes_atomic(path: Path, data: bytes) -> None:
+    """Write to a sibling temp file and rename it over path - readers never see a half-written file"""
+    tmp_path = path.with_name(path.name + ".tmp")
+    try:
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise